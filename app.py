@@ -1,13 +1,18 @@
 import streamlit as st
 import pandas as pd
-import csv
 import json
-import unicodedata
-import zipfile
-import io
 from datetime import datetime
 import os
 import hashlib
+from rhum.import_csv import empreinte, importer_adherents
+from rhum.analytique import Analytique
+from rhum.metier import MOIS_DEGUSTATIONS, RHUMOTHEQUE_PRELEVEMENT, cle_nom, degustation_vide, etat_vide, invite_vide, mois_vide
+from rhum.locataires import Locataire, Locataires
+from rhum.lots import PARTICIPANT_VIDE, annuler, copier_commandes, fixer, reporter_degustation, vider_degustation
+from rhum.profil import Profileur
+from rhum.rapprochement import appliquer, lire_releve, rapprocher
+from rhum.recherche import IndexRhum
+from rhum.stockage import ecrire_atomique
 
 # --- CONFIGURATION PAGE ---
 st.set_page_config(
@@ -17,34 +22,68 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-FICHIER_ETAT = "rhum_etat.json"
+RHUM_PAR_PAGE = 15
+ANNULATIONS = 10  # opérations groupées annulables par session
 FICHIER_MDP = "rhum_mdp.json"
-CAPACITE_BOUTEILLE = 20  # Capacité théorique (20 samples de 3cl + marge)
-RHUMOTHEQUE_PRELEVEMENT = 2  # Nombre de samples prélevés pour la rhumothèque (2x3cl)
+# Mode multi-associations : un sous-dossier par association (voir rhum/locataires.py)
+DOSSIER_ASSOCIATIONS = os.environ.get("RHUM_ASSOCIATIONS")
+ASSOCIATIONS_EN_MEMOIRE = int(os.environ.get("RHUM_ASSOCIATIONS_LRU", 16))
+PROFIL_ADMIN = os.environ.get("RHUM_PROFIL_ADMIN")  # empreinte SHA-256 du mot de passe du panneau de profil
+
+@st.cache_resource
+def ouvrir_profil(association=None):
+    # Chronométrage des reruns, seulement si RHUM_PROFIL (ou RHUM_PROFIL_TRACE) est défini au lancement ;
+    # un profil par association : aucune ne voit les mesures des autres
+    return Profileur.depuis_environnement(**({"association": association} if association else {}))
+
+profil = ouvrir_profil(st.session_state.get("association") if DOSSIER_ASSOCIATIONS else None)
+profil.debut()
 
 # --- GESTION MOT DE PASSE ---
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def charger_mdp():
-    if os.path.exists(FICHIER_MDP):
+def chemin_mdp(association=None):
+    # Un mot de passe par association, dans son dossier
+    return os.path.join(ouvrir_locataires().chemin(association), FICHIER_MDP) if association else FICHIER_MDP
+
+def charger_mdp(chemin):
+    if os.path.exists(chemin):
         try:
-            with open(FICHIER_MDP, "r") as f:
+            with open(chemin, "r") as f:
                 data = json.load(f)
                 return data.get("password_hash", None)
-        except: return None
+        except (OSError, ValueError) as e:
+            # Surtout pas None : l'écran de création de mot de passe serait proposé à n'importe qui
+            st.error(f"Fichier mot de passe illisible ({chemin}) : {e}")
+            st.stop()
     return None
 
-def sauvegarder_mdp(password_hash):
-    try:
-        with open(FICHIER_MDP, "w") as f:
-            json.dump({"password_hash": password_hash}, f)
+def sauvegarder_mdp(chemin, password_hash):
+    try: ecrire_atomique(chemin, json.dumps({"password_hash": password_hash}).encode())
     except Exception as e: st.error(f"Erreur sauvegarde MDP : {e}")
 
+def choisir_association():
+    noms = ouvrir_locataires().liste()
+    if not noms:
+        st.error(f"Aucune association dans {DOSSIER_ASSOCIATIONS} (un sous-dossier par association).")
+        return None
+    return st.selectbox("🏝️ Association", noms, key="choix_association")
+
 def verifier_authentification():
     if 'authenticated' not in st.session_state: st.session_state.authenticated = False
-    mdp_hash = charger_mdp()
+    association = None
+    if DOSSIER_ASSOCIATIONS:
+        association = st.session_state.get("association") if st.session_state.authenticated else choisir_association()
+        if association is None: return False
+    chemin = chemin_mdp(association)
+    mdp_hash = charger_mdp(chemin)
     
+    if mdp_hash is None and DOSSIER_ASSOCIATIONS:
+        # Un processus pour toutes les associations : pas de création en libre-service, le mot de passe
+        # est déposé avec le dossier de l'association (rhum_mdp.json)
+        st.error(f"Aucun mot de passe pour {association} : contactez l'administrateur.")
+        return False
     if mdp_hash is None:
         st.info("⚠️ Aucun mot de passe. Veuillez en créer un.")
         with st.form("init_pwd"):
@@ -54,7 +93,7 @@ def verifier_authentification():
                 if len(p1) < 4: st.error("Trop court (min 4 caractères)")
                 elif p1 != p2: st.error("Les mots de passe ne correspondent pas")
                 else:
-                    sauvegarder_mdp(hash_password(p1))
+                    sauvegarder_mdp(chemin, hash_password(p1))
                     st.success("✅ Créé ! Rechargez la page.")
                     st.rerun()
         return False
@@ -67,16 +106,28 @@ def verifier_authentification():
         if st.form_submit_button("🔓 Connexion"):
             if hash_password(pwd) == mdp_hash:
                 st.session_state.authenticated = True
+                st.session_state.association = association
                 st.rerun()
             else: st.error("❌ Incorrect")
     
+    if DOSSIER_ASSOCIATIONS: return False  # Réinitialisation réservée à l'administrateur
     with st.expander("⚠️ Réinitialiser le mot de passe"):
         if st.button("🗑️ Supprimer le mot de passe actuel"):
-            try: os.remove(FICHIER_MDP)
+            try: os.remove(chemin)
             except: pass
             st.warning("Mot de passe supprimé. Rechargez la page.")
     return False
 
+@st.cache_resource
+def ouvrir_locataires():
+    # Associations chargées, les moins récemment utilisées évincées au-delà de ASSOCIATIONS_EN_MEMOIRE
+    return Locataires(DOSSIER_ASSOCIATIONS, ASSOCIATIONS_EN_MEMOIRE)
+
+@st.cache_resource
+def ouvrir_locataire_unique():
+    # Mode historique : une seule association, fichiers dans le dossier courant
+    return Locataire(".")
+
 # --- THEME CSS ---
 st.markdown("""
 <style>
@@ -92,100 +143,117 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-if not verifier_authentification(): st.stop()
+with profil.section("authentification"): authentifie = verifier_authentification()
+if not authentifie: st.stop()
 
 # --- FONCTIONS METIER ---
-def retirer_accents(texte):
-    if not isinstance(texte, str): return texte
-    try: return "".join([c for c in unicodedata.normalize('NFKD', texte) if not unicodedata.combining(c)])
-    except: return texte
-
-def sauvegarder_etat():
+# Un seul exemplaire de l'état par association et par processus, partagé par toutes ses sessions
+locataire = ouvrir_locataires().obtenir(st.session_state.association) if DOSSIER_ASSOCIATIONS else ouvrir_locataire_unique()
+depot = locataire.depot
+partage = locataire.partage
+
+def marquer(*entite, champs=None):
+    # Écriture différée et regroupée en arrière-plan (voir rhum/persistance.py) ;
+    # `champs` limite l'écriture aux champs modifiés pour ne pas écraser ceux d'une autre session ;
+    # la valeur est relevée dans l'état que ce rerun a modifié, même s'il a été rechargé depuis
+    partage.ecritures.marquer(*entite, champs=champs, etat=st.session_state._etat)
+    partage.modifie("analytique", "taille_etat")
+    if entite[0] == "rhum": partage.modifie("index_rhum")
+
+def signaler(entites):
+    # Écriture groupée (rapprochement, opérations groupées) : tables et indicateurs touchés à reconstruire
+    partage.modifie("adh", "analytique", "taille_etat", *{f"s_{e[1]}" if e[0] == "commande" else f"deg_adh_{e[1]}" if e[0] == "participant" else f"deg_inv_{e[1]}"
+                                          for e in entites if e[0] != "adhesion"})
+
+def analytique():
+    # Matrices adhérent × mois, reconstruites seulement après une modification
+    return partage.table("analytique", lambda: Analytique(partage.etat, partage.gratuits))
+
+def sauvegarder(operation, *args):
+    # Écriture immédiate (opérations globales), après les modifications en attente ; False en cas d'échec
     try:
-        with open(FICHIER_ETAT, "w", encoding="utf-8") as f:
-            json.dump({
-                "adherents_noms": st.session_state.adherents_noms,
-                "mois_data": st.session_state.mois_data,
-                "adhesions": st.session_state.adhesions,
-                "degustations": st.session_state.degustations,
-                "solde_depart": st.session_state.solde_depart,
-                "rhumotheque": st.session_state.rhumotheque
-            }, f, ensure_ascii=False, indent=4)
-    except Exception as e: st.error(f"Erreur sauvegarde : {e}")
+        with profil.section("sauvegarde"):
+            partage.ecritures.vider()
+            operation(*args)
+        profil.compter("sauvegardes immédiates")
+        return True
+    except Exception as e:
+        st.error(f"Erreur sauvegarde : {e}")
+        return False
 
 def charger_etat():
     # Init par défaut
-    if 'adherents_noms' not in st.session_state: st.session_state.adherents_noms = []
-    if 'mois_data' not in st.session_state:
-        st.session_state.mois_data = {m: {"nom_bouteille": "", "prix_achat": 0.0, "prix_sample": 0.0, "adherents": {}} 
-                                      for m in ["Février", "Mars", "Avril", "Mai", "Juin", "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]}
-    if 'adhesions' not in st.session_state: st.session_state.adhesions = {}
-    if 'degustations' not in st.session_state:
-        st.session_state.degustations = {m: {"participants": {}, "invites": [], "prix_bouteilles": 0.0} 
-                                         for m in ["Mars", "Juin", "Septembre", "Décembre"]}
-    if 'solde_depart' not in st.session_state: st.session_state.solde_depart = 0.0
-    if 'rhumotheque' not in st.session_state: st.session_state.rhumotheque = {}
-
-    if os.path.exists(FICHIER_ETAT):
-        try:
-            with open(FICHIER_ETAT, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                st.session_state.adherents_noms = data.get("adherents_noms", [])
-                st.session_state.mois_data = data.get("mois_data", st.session_state.mois_data)
-                st.session_state.adhesions = data.get("adhesions", {})
-                st.session_state.solde_depart = data.get("solde_depart", 0.0)
-                st.session_state.rhumotheque = data.get("rhumotheque", {})
-                
-                # Migration dégustations
-                loaded_deg = data.get("degustations", st.session_state.degustations)
-                for m in ["Mars", "Juin", "Septembre", "Décembre"]:
-                    if m in loaded_deg and "prix_bouteilles" not in loaded_deg[m]:
-                        loaded_deg[m]["prix_bouteilles"] = 0.0
-                st.session_state.degustations = loaded_deg
-        except: pass
-
-charger_etat()
-GRATUITS_VIE = ["BORDES", "JAUBERT"]
+    for k, v in etat_vide().items():
+        if k not in st.session_state: st.session_state[k] = v
+
+    try:
+        # Rechargé depuis la base seulement si sa version a changé ; pas de copie par session
+        data = st.session_state._etat = partage.lire()
+        st.session_state.adherents_noms = data["adherents_noms"]
+        st.session_state.mois_data = data["mois_data"]
+        st.session_state.adhesions = data["adhesions"]
+        st.session_state.solde_depart = data["solde_depart"]
+        st.session_state.rhumotheque = data["rhumotheque"]
+        st.session_state.degustations = data["degustations"]
+    except Exception as e: st.error(f"Erreur chargement : {e}")
+
+with profil.section("chargement état"): charger_etat()
+
+# --- ÉDITION DES TABLEAUX ---
+@profil.chrono("tableau")
+def editer_table(cle, construire, **kwargs):
+    """st.data_editor sur un DataFrame en cache (reconstruit seulement quand la table change).
+
+    Renvoie (df, delta) où delta = {ligne: {colonne: valeur}} ne contient que les
+    cellules modifiées par l'utilisateur depuis le rerun précédent.
+    """
+    df = partage.table(cle, construire)
+    # Tableau non affiché au rerun précédent (autre section) : l'éditeur repart de zéro
+    vu = st.session_state.get(f"_vu_{cle}", {}) if cle in st.session_state else {}
+    kwargs.setdefault("use_container_width", True)
+    st.data_editor(df, key=cle, hide_index=True, **kwargs)
+    edits = {int(i): v for i, v in st.session_state[cle]["edited_rows"].items()}
+    delta = {}
+    for i in set(edits) | set(vu):
+        if i >= len(df): continue
+        for col in set(edits.get(i, {})) | set(vu.get(i, {})):
+            # Cellule absente = revenue à la valeur d'origine du DataFrame
+            val = edits.get(i, {}).get(col, df[col].iloc[i])
+            if val != vu.get(i, {}).get(col, df[col].iloc[i]): delta.setdefault(i, {})[col] = val
+    st.session_state[f"_vu_{cle}"] = {i: dict(v) for i, v in edits.items()}
+    return df, delta
 
 # --- SIDEBAR ---
-with st.sidebar:
+with st.sidebar, profil.section("barre latérale"):
     st.markdown("<div style='text-align: center; font-size: 80px;'>🥃</div>", unsafe_allow_html=True)
     st.markdown("<h2 style='text-align: center;'>Gestion Rhum</h2>", unsafe_allow_html=True)
+    if DOSSIER_ASSOCIATIONS: st.markdown(f"<p style='text-align: center;'>🏝️ {st.session_state.association}</p>", unsafe_allow_html=True)
     if st.button("🚪 Déconnexion"):
+        partage.ecritures.vider()
+        if DOSSIER_ASSOCIATIONS:
+            # Rien de la session (sélections, tableaux en cours, imports) ne doit passer à une autre association
+            for k in list(st.session_state): del st.session_state[k]
         st.session_state.authenticated = False
         st.rerun()
+    if partage.ecritures.derniere_erreur: st.error(f"Erreur sauvegarde : {partage.ecritures.derniere_erreur}")
     
     st.markdown("---")
     
     # SOLDE DÉPART
     st.markdown('<div class="solde-box"><div class="solde-title">💰 SOLDE N-1</div>', unsafe_allow_html=True)
-    solde = st.number_input("Trésorerie Décembre N-1 (€)", value=st.session_state.solde_depart, step=10.0, key="inp_solde")
+    if st.session_state.get("_solde_affiche") != st.session_state.solde_depart:
+        # Solde modifié ailleurs (clôture, autre session) : on resynchronise le champ
+        st.session_state.inp_solde = st.session_state._solde_affiche = st.session_state.solde_depart
+    solde = st.number_input("Trésorerie Décembre N-1 (€)", step=10.0, key="inp_solde")
     if solde != st.session_state.solde_depart:
-        st.session_state.solde_depart = solde
-        sauvegarder_etat()
+        st.session_state.solde_depart = st.session_state._solde_affiche = st.session_state._etat["solde_depart"] = solde
+        marquer("solde")
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # CALCUL BILAN GLOBAL
-    tot_samples_marge = 0
-    tot_samples_qty = 0
-    for m_data in st.session_state.mois_data.values():
-        qty = sum(d["qte"] for d in m_data["adherents"].values())
-        payes = sum(d["qte"] for d in m_data["adherents"].values() if d["paye"])
-        if qty > 0:
-            ca_reel = payes * m_data["prix_sample"]
-            tot_samples_marge += (ca_reel - m_data["prix_achat"])
-            tot_samples_qty += qty
-
-    tot_adh_encaisse = sum(35 for p in st.session_state.adhesions.values() if p)
-    
-    tot_deg_marge = 0
-    for dg in st.session_state.degustations.values():
-        ca = sum(35 for p in dg["participants"].values() if p.get("inscrit") and p.get("paye"))
-        ca += sum(35 for i in dg["invites"] if i.get("paye"))
-        cout_repas = 15 * (sum(1 for p in dg["participants"].values() if p.get("inscrit") and p.get("repas")) + sum(1 for i in dg["invites"] if i.get("repas")))
-        tot_deg_marge += (ca - cout_repas - dg.get("prix_bouteilles", 0))
-
-    activite = tot_samples_marge + tot_adh_encaisse + tot_deg_marge
+    # CALCUL BILAN GLOBAL (totaux tenus à jour par deltas, voir rhum/tresorerie.py)
+    livre = partage.livre
+    tot_samples_qty = livre.tot_samples_qty
+    activite = livre.activite
     caisse_finale = st.session_state.solde_depart + activite
 
     st.markdown('<div class="bilan-box"><div class="bilan-title">💰 TRÉSORERIE TOTALE</div>', unsafe_allow_html=True)
@@ -193,6 +261,12 @@ with st.sidebar:
     c1.metric("Samples", tot_samples_qty)
     c2.metric("Caisse", f"{caisse_finale:.0f} €", delta=f"{activite:+.0f} € (Activité)", help="Solde départ + Activité année")
     st.markdown('</div>', unsafe_allow_html=True)
+    if st.button("🔎 Vérifier le bilan", help="Recalcul complet et comparaison avec les totaux tenus à jour"):
+        ecarts = livre.verifier(partage.etat)
+        if ecarts:
+            st.warning(f"⚠️ {len(ecarts)} écart(s) corrigé(s)")
+            st.dataframe(pd.DataFrame(ecarts, columns=["Clé", "Tenu", "Recalculé"]), hide_index=True)
+        else: st.success("✅ Bilan cohérent")
     
     st.markdown("---")
     
@@ -200,201 +274,272 @@ with st.sidebar:
     up = st.file_uploader("📥 Import Adhérents (CSV)", type=['csv'])
     if up:
         try:
-            lignes = up.read().decode('utf-8').splitlines()
-            reader = csv.reader(lignes, delimiter=';')
-            next(reader, None)
-            noms = []
-            for r in reader:
-                if len(r) >= 2 and (r[0] or r[1]):
-                    noms.append(f"{r[0].strip().upper()} {r[1].strip().title()}")
-            st.session_state.adherents_noms = sorted(list(set(noms)))
-            st.success(f"✅ {len(st.session_state.adherents_noms)} chargés")
-            sauvegarder_etat()
+            # Un fichier n'est traité qu'une fois, même s'il reste dans l'uploader ; il n'est
+            # retenu qu'une fois l'ajout enregistré (sinon nouvel essai au prochain rerun)
+            faits = st.session_state.setdefault("imports_faits", {})
+            h = empreinte(up)
+            if h not in faits:
+                rapport = importer_adherents(up, st.session_state.adherents_noms)
+                if not rapport["ajoutes"]: faits[h] = rapport
+                elif sauvegarder(depot.ajouter_adherents, rapport["ajoutes"]):
+                    faits[h] = rapport
+                    partage.invalider()
+                    charger_etat()
+            if h in faits:
+                rapport = faits[h]
+                st.success(f"✅ {len(rapport['ajoutes'])} ajoutés · {rapport['doublons']} déjà présents · {len(rapport['rejetes'])} rejetés")
+                if rapport["rejetes"]:
+                    with st.expander("Lignes rejetées"):
+                        st.dataframe(pd.DataFrame(rapport["rejetes"], columns=["Ligne", "Motif"]), hide_index=True)
         except Exception as e: st.error(f"Erreur: {e}")
 
     st.markdown("---")
     
     # EXPORT
     if st.button("📦 Exporter Année (ZIP)"):
-        buf = io.BytesIO()
-        has_data = False
-        with zipfile.ZipFile(buf, "a", zipfile.ZIP_DEFLATED, False) as z:
-            # Bilan
-            z.writestr("00_Bilan.csv", f"Solde Depart;{st.session_state.solde_depart}\nActivite;{activite}\nCaisse Finale;{caisse_finale}")
-            has_data = True
-            
-            # Samples
-            for m, d in st.session_state.mois_data.items():
-                lines = [f"{retirer_accents(n)};{v['qte']};{'OUI' if v['paye'] else 'NON'}" for n, v in d["adherents"].items() if v['qte']>0]
-                if lines:
-                    content = f"Mois;{retirer_accents(m)}\nBouteille;{retirer_accents(d['nom_bouteille'])}\n\nNom;Samples;Paye\n" + "\n".join(lines)
-                    z.writestr(f"Samples_{retirer_accents(m)}.csv", content)
-            
-            # Rhumotheque
-            if st.session_state.rhumotheque:
-                r_lines = ["Mois;Bouteille;En Stock;Valeur;Notes"]
-                for m, rd in st.session_state.rhumotheque.items():
-                    if rd.get("en_stock", False):
-                        r_lines.append(f"{retirer_accents(m)};{retirer_accents(rd['nom'])};OUI;{rd['valeur']};{retirer_accents(rd.get('notes',''))}")
-                z.writestr("Rhumotheque.csv", "\n".join(r_lines))
-
-        st.download_button("⬇️ Télécharger ZIP", buf.getvalue(), f"Rhum_{datetime.now().year}.zip", "application/zip")
+        with profil.section("export ZIP"):
+            partage.ecritures.vider()
+            # Reconstruite seulement si l'état a changé depuis le dernier export
+            archive = locataire.export.obtenir(depot.version(), partage.lire(), partage.livre.activite)
+        profil.compter("octets exportés", len(archive))
+        st.download_button("⬇️ Télécharger ZIP", archive, f"Rhum_{datetime.now().year}.zip", "application/zip")
 
     st.markdown("---")
-    if st.button("📅 Reporter Solde N+1"):
-        st.session_state.solde_depart = caisse_finale
-        sauvegarder_etat()
-        st.success("✅ Solde reporté !")
-        st.rerun()
-
-    if st.button("🧨 Reset Année"):
-        st.session_state.mois_data = {m: {"nom_bouteille": "", "prix_achat": 0.0, "prix_sample": 0.0, "adherents": {}} for m in st.session_state.mois_data}
-        st.session_state.adhesions = {}
-        st.session_state.degustations = {m: {"participants": {}, "invites": [], "prix_bouteilles": 0.0} for m in st.session_state.degustations}
-        st.session_state.rhumotheque = {}
-        sauvegarder_etat()
-        st.rerun()
+    # CLÔTURE : la saison est archivée (immuable) avant la remise à zéro, le solde est reporté sur N+1
+    annee = depot.annee()
+    confirme = st.checkbox(f"Confirmer la clôture {annee}", key=f"conf_cloture_{annee}")
+    if st.button(f"🗄️ Clôturer l'année {annee}", disabled=not confirme):
+        try:
+            partage.ecritures.vider()
+            locataire.archives.cloturer(annee, partage.lire(), partage.livre.activite, depot.registre())
+        except FileExistsError: st.error(f"La saison {annee} est déjà archivée.")
+        else:
+            nouvel_etat = etat_vide()
+            nouvel_etat["adherents_noms"] = st.session_state.adherents_noms
+            nouvel_etat["solde_depart"] = caisse_finale
+            nouvel_etat["mois_data"] = {m: mois_vide() for m in st.session_state.mois_data}
+            nouvel_etat["degustations"] = {m: degustation_vide() for m in st.session_state.degustations}
+            try:
+                # Remise à zéro et année suivante ensemble ; en cas d'échec la saison reste ouverte
+                depot.nouvelle_saison(nouvel_etat, annee + 1)
+            except Exception as e:
+                locataire.archives.annuler_cloture(annee)
+                st.error(f"Clôture interrompue, saison {annee} toujours ouverte : {e}")
+            else:
+                partage.invalider()
+                st.rerun()
 
 # --- CORPS PRINCIPAL ---
+# Seule la section choisie est exécutée ; chaque mois, dégustation et bouteille est un
+# fragment qui se réexécute seul lors d'une modification (le bilan latéral suit au prochain rerun complet).
 st.title("🥃 Gestion Association Rhum")
 
-# Création des onglets
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["💳 Adhésions", "🍽️ Dégustations", "🥃 Samples Mensuels", "📦 Stock Restant", "🏛️ Rhumothèque"])
+SECTIONS = ["💳 Adhésions", "🍽️ Dégustations", "🥃 Samples Mensuels", "📦 Stock Restant", "🏛️ Rhumothèque", "🧾 Relevés", "🏦 Rapprochement", "🧰 Opérations groupées", "📚 Historique"]
+section = st.radio("Section", SECTIONS, horizontal=True, key="section", label_visibility="collapsed")
 
 # 1. ADHÉSIONS
-with tab1:
+@st.fragment
+@profil.chrono("💳 Adhésions")
+def afficher_adhesions():
+    charger_etat()
     st.header("💳 Adhésions (35€)")
     if not st.session_state.adherents_noms: st.info("Importez des adhérents.")
     else:
-        data = [{"Nom": n, "Gratuit": (n.split()[0].upper() in GRATUITS_VIE), "Payé": st.session_state.adhesions.get(n, False)} for n in st.session_state.adherents_noms]
-        df = pd.DataFrame(data)
-        edf = st.data_editor(df, column_config={"Nom": st.column_config.TextColumn(disabled=True), "Gratuit": st.column_config.CheckboxColumn(disabled=True), "Payé": st.column_config.CheckboxColumn("Réglé ?")}, hide_index=True, use_container_width=True, height=500)
+        df, delta = editer_table("adh", lambda: pd.DataFrame([{"Nom": n, "Gratuit": n in partage.gratuits, "Payé": st.session_state.adhesions.get(n, False)} for n in st.session_state.adherents_noms]),
+                                 column_config={"Nom": st.column_config.TextColumn(disabled=True), "Gratuit": st.column_config.CheckboxColumn(disabled=True), "Payé": st.column_config.CheckboxColumn("Réglé ?")}, height=500)
         
-        chg = False
-        for _, r in edf.iterrows():
-            if not r["Gratuit"] and st.session_state.adhesions.get(r["Nom"], False) != r["Payé"]:
-                st.session_state.adhesions[r["Nom"]] = r["Payé"]
-                chg = True
-        if chg: sauvegarder_etat()
+        chg = {}
+        for i, cols in delta.items():
+            n = df["Nom"].iloc[i]
+            if "Payé" in cols and not df["Gratuit"].iloc[i] and st.session_state.adhesions.get(n, False) != cols["Payé"]:
+                partage.livre.adhesion(st.session_state.adhesions.get(n, False), cols["Payé"])
+                st.session_state.adhesions[n] = chg[n] = bool(cols["Payé"])
+        if chg:
+            partage.modifie("adh")
+            for n in chg: marquer("adhesion", n)
+
+        with st.expander("✏️ Renommer un adhérent"):
+            with st.form("renommer"):
+                ancien = st.selectbox("Adhérent", st.session_state.adherents_noms)
+                nouveau = " ".join(st.text_input("Nouveau nom (NOM Prénom)").split())
+                if st.form_submit_button("Renommer") and nouveau:
+                    if cle_nom(nouveau) in {cle_nom(n) for n in st.session_state.adherents_noms if n != ancien}:
+                        st.error(f"{nouveau} existe déjà")
+                    else:
+                        # Une ligne du registre : commandes, adhésion et dégustations suivent par identifiant
+                        if sauvegarder(depot.renommer_adherent, ancien, nouveau):
+                            partage.invalider()
+                            st.rerun()
 
 # 2. DÉGUSTATIONS
-with tab2:
-    st.header("🍽️ Dégustations")
-    liste_mois_deg = ["Mars", "Juin", "Septembre", "Décembre"]
-    onglets_visuels = st.tabs(liste_mois_deg)
+@st.fragment
+@profil.chrono("🍽️ Dégustations")
+def afficher_degustation(mois_nom):
+    charger_etat()
+    d = st.session_state.degustations[mois_nom]
+    c1, c2 = st.columns(2)
+    c1.metric("Prix Repas", "15 €")
+    pb = c2.number_input(f"Prix 5 Bouteilles ({mois_nom})", value=d.get("prix_bouteilles", 0.0), step=5.0, key=f"pb_{mois_nom}")
+    if pb != d.get("prix_bouteilles", 0.0):
+        d["prix_bouteilles"] = pb
+        partage.livre.prix_degustation(mois_nom, pb)
+        marquer("degustation", mois_nom)
     
-    for i, mois_nom in enumerate(liste_mois_deg):
-        with onglets_visuels[i]:
-            d = st.session_state.degustations[mois_nom]
-            c1, c2 = st.columns(2)
-            c1.metric("Prix Repas", "15 €")
-            pb = c2.number_input(f"Prix 5 Bouteilles ({mois_nom})", value=d.get("prix_bouteilles", 0.0), step=5.0, key=f"pb_{mois_nom}")
-            if pb != d.get("prix_bouteilles", 0.0):
-                d["prix_bouteilles"] = pb
-                sauvegarder_etat()
-            
-            # Adhérents
-            data_adh = [{"Nom": n, "Inscrit": d["participants"].get(n, {}).get("inscrit", False), "Repas": d["participants"].get(n, {}).get("repas", False), "Payé": d["participants"].get(n, {}).get("paye", False)} for n in st.session_state.adherents_noms]
-            edf = st.data_editor(pd.DataFrame(data_adh), column_config={"Nom": st.column_config.TextColumn(disabled=True)}, hide_index=True, use_container_width=True, key=f"deg_adh_{mois_nom}", height=300)
-            
-            chg = False
-            for _, r in edf.iterrows():
-                old = d["participants"].get(r["Nom"], {})
-                if old.get("inscrit") != r["Inscrit"] or old.get("repas") != r["Repas"] or old.get("paye") != r["Payé"]:
-                    d["participants"][r["Nom"]] = {"inscrit": r["Inscrit"], "repas": r["Repas"], "paye": r["Payé"]}
-                    chg = True
-            if chg: sauvegarder_etat()
-
-            # Invités
-            c1, c2 = st.columns([3, 1])
-            new_inv = c1.text_input("Invité", key=f"ni_{mois_nom}")
-            if c2.button("Ajouter", key=f"bi_{mois_nom}") and new_inv:
-                d["invites"].append({"nom": new_inv, "repas": False, "paye": False})
-                sauvegarder_etat()
-                st.rerun()
-            
-            if d["invites"]:
-                inv_df = pd.DataFrame(d["invites"])
-                inv_ed = st.data_editor(inv_df, hide_index=True, key=f"deg_inv_{mois_nom}")
-                d["invites"] = inv_ed.to_dict('records')
-                sauvegarder_etat()
+    # Adhérents
+    df, delta = editer_table(f"deg_adh_{mois_nom}", lambda: pd.DataFrame([{"Nom": n, "Inscrit": d["participants"].get(n, {}).get("inscrit", False), "Repas": d["participants"].get(n, {}).get("repas", False), "Payé": d["participants"].get(n, {}).get("paye", False)} for n in st.session_state.adherents_noms]),
+                             column_config={"Nom": st.column_config.TextColumn(disabled=True)}, height=300)
+    
+    chg = {}
+    for i, cols in delta.items():
+        n = df["Nom"].iloc[i]
+        old = d["participants"].get(n, {})
+        new = {"inscrit": bool(old.get("inscrit")), "repas": bool(old.get("repas")), "paye": bool(old.get("paye"))}
+        new.update({{"Inscrit": "inscrit", "Repas": "repas", "Payé": "paye"}[c]: bool(v) for c, v in cols.items()})
+        if new != old:
+            d["participants"][n] = new
+            chg[n] = {k for k in new if new[k] != bool(old.get(k))}
+            partage.livre.participant(mois_nom, old, new)
+    if chg:
+        partage.modifie(f"deg_adh_{mois_nom}")
+        for n, champs in chg.items(): marquer("participant", mois_nom, n, champs=champs)
+
+    # Invités
+    c1, c2 = st.columns([3, 1])
+    new_inv = c1.text_input("Invité", key=f"ni_{mois_nom}")
+    if c2.button("Ajouter", key=f"bi_{mois_nom}") and new_inv:
+        d["invites"].append(invite_vide(new_inv))
+        partage.livre.invites(mois_nom, [], d["invites"][-1:])
+        partage.modifie(f"deg_inv_{mois_nom}")
+        marquer("invite", mois_nom, d["invites"][-1]["id"])
+        st.rerun(scope="fragment")
+    
+    if d["invites"]:
+        _, delta = editer_table(f"deg_inv_{mois_nom}", lambda: pd.DataFrame(d["invites"]), column_order=["nom", "repas", "paye"], use_container_width=False)
+        if delta:
+            # Enregistré seulement si une cellule a réellement changé ; chaque invité s'écrit seul (par identifiant)
+            anciens = [dict(i) for i in d["invites"]]
+            for i, cols in delta.items():
+                d["invites"][i].update({c: (bool(v) if c in ("repas", "paye") else v) for c, v in cols.items()})
+            partage.livre.invites(mois_nom, anciens, d["invites"])
+            partage.modifie(f"deg_inv_{mois_nom}")
+            for i, cols in delta.items(): marquer("invite", mois_nom, d["invites"][i]["id"], champs=set(cols))
 
 # 3. SAMPLES
-with tab3:
-    st.header("🥃 Samples Mensuels")
-    tms = st.tabs(list(st.session_state.mois_data.keys()))
-    for i, (mois, data) in enumerate(st.session_state.mois_data.items()):
-        with tms[i]:
-            c1, c2, c3 = st.columns([2, 1, 1])
-            nom_b = c1.text_input("Nom Bouteille", value=data["nom_bouteille"], key=f"nb_{mois}")
-            pa = c2.number_input("Prix Achat", value=data["prix_achat"], step=1.0, key=f"pa_{mois}")
-            ps = c3.number_input("Prix Sample", value=data["prix_sample"], step=0.5, key=f"ps_{mois}")
-            
-            if nom_b != data["nom_bouteille"] or pa != data["prix_achat"] or ps != data["prix_sample"]:
-                data["nom_bouteille"] = nom_b
-                data["prix_achat"] = pa
-                data["prix_sample"] = ps
-                
-                # Mise à jour auto Rhumothèque
-                if nom_b and mois not in st.session_state.rhumotheque:
-                    st.session_state.rhumotheque[mois] = {
-                        "nom": nom_b,
-                        "en_stock": True,
-                        "valeur": ps * RHUMOTHEQUE_PRELEVEMENT, 
-                        "notes": ""
-                    }
-                elif nom_b and mois in st.session_state.rhumotheque:
-                    st.session_state.rhumotheque[mois]["nom"] = nom_b
-                    st.session_state.rhumotheque[mois]["valeur"] = ps * RHUMOTHEQUE_PRELEVEMENT
-                
-                sauvegarder_etat()
-                st.rerun()
+@st.fragment
+@profil.chrono("🥃 Samples")
+def afficher_mois(mois):
+    charger_etat()
+    data = st.session_state.mois_data[mois]
+    c1, c2, c3 = st.columns([2, 1, 1])
+    nom_b = c1.text_input("Nom Bouteille", value=data["nom_bouteille"], key=f"nb_{mois}")
+    pa = c2.number_input("Prix Achat", value=data["prix_achat"], step=1.0, key=f"pa_{mois}")
+    ps = c3.number_input("Prix Sample", value=data["prix_sample"], step=0.5, key=f"ps_{mois}")
+    
+    if nom_b != data["nom_bouteille"] or pa != data["prix_achat"] or ps != data["prix_sample"]:
+        champs = {k for k, v in (("nom_bouteille", nom_b), ("prix_achat", pa), ("prix_sample", ps)) if data[k] != v}
+        data["nom_bouteille"] = nom_b
+        data["prix_achat"] = pa
+        data["prix_sample"] = ps
+        partage.livre.prix_mois(mois, pa, ps)
+        
+        # Mise à jour auto Rhumothèque
+        champs_rhum = {"nom", "valeur"} if mois in st.session_state.rhumotheque else None
+        if nom_b and mois not in st.session_state.rhumotheque:
+            st.session_state.rhumotheque[mois] = {
+                "nom": nom_b,
+                "en_stock": True,
+                "valeur": ps * RHUMOTHEQUE_PRELEVEMENT, 
+                "notes": ""
+            }
+        elif nom_b and mois in st.session_state.rhumotheque:
+            st.session_state.rhumotheque[mois]["nom"] = nom_b
+            st.session_state.rhumotheque[mois]["valeur"] = ps * RHUMOTHEQUE_PRELEVEMENT
+        
+        marquer("mois", mois, champs=champs)
+        if nom_b and mois in st.session_state.rhumotheque: marquer("rhum", mois, champs=champs_rhum)
 
-            # Tableau
-            if st.session_state.adherents_noms:
-                rows = [{"Nom": n, "Qté": data["adherents"].get(n, {"qte":0})["qte"], "Payé": data["adherents"].get(n, {"paye":False})["paye"]} for n in st.session_state.adherents_noms]
-                edf = st.data_editor(pd.DataFrame(rows), column_config={"Nom": st.column_config.TextColumn(disabled=True), "Qté": st.column_config.NumberColumn(min_value=0, max_value=10), "Payé": st.column_config.CheckboxColumn()}, hide_index=True, use_container_width=True, key=f"s_{mois}", height=400)
-                
-                chg = False
-                for _, r in edf.iterrows():
-                    d = data["adherents"].get(r["Nom"], {"qte":0, "paye":False})
-                    if d["qte"] != r["Qté"] or d["paye"] != r["Payé"]:
-                        data["adherents"][r["Nom"]] = {"qte": r["Qté"], "paye": r["Payé"]}
-                        chg = True
-                if chg: sauvegarder_etat()
-            
-            # KPI du mois
-            total_samples = sum(d["qte"] for d in data["adherents"].values())
-            total_payes = sum(d["qte"] for d in data["adherents"].values() if d["paye"])
-            ca_reel = total_payes * ps
-            marge_reelle = ca_reel - pa
-            c1, c2, c3 = st.columns(3)
-            c1.metric("Payés / Commandés", f"{total_payes} / {total_samples}")
-            c2.metric("Marge Réelle", f"{marge_reelle:.2f} €")
-            c3.metric("Bouteille payée ?", "OUI" if marge_reelle >= 0 else "NON", delta_color="normal")
+    # Tableau
+    if st.session_state.adherents_noms:
+        df, delta = editer_table(f"s_{mois}", lambda: pd.DataFrame([{"Nom": n, "Qté": data["adherents"].get(n, {"qte":0})["qte"], "Payé": data["adherents"].get(n, {"paye":False})["paye"]} for n in st.session_state.adherents_noms]),
+                                 column_config={"Nom": st.column_config.TextColumn(disabled=True), "Qté": st.column_config.NumberColumn(min_value=0, max_value=10), "Payé": st.column_config.CheckboxColumn()}, height=400)
+        
+        chg = {}
+        for i, cols in delta.items():
+            n = df["Nom"].iloc[i]
+            d = data["adherents"].get(n, {"qte":0, "paye":False})
+            new = {"qte": int(cols.get("Qté", d["qte"]) or 0), "paye": bool(cols.get("Payé", d["paye"]))}
+            if new != d:
+                data["adherents"][n] = new
+                chg[n] = {k for k in new if new[k] != d[k]}
+                partage.livre.commande(mois, d, new)
+        if chg:
+            partage.modifie(f"s_{mois}")
+            for n, champs in chg.items(): marquer("commande", mois, n, champs=champs)
+    
+    # KPI du mois (agrégats du grand livre, O(1))
+    agr = partage.livre.mois.get(mois, {"qte": 0, "payes": 0})
+    total_samples, total_payes = agr["qte"], agr["payes"]
+    ca_reel = total_payes * ps
+    marge_reelle = ca_reel - pa
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Payés / Commandés", f"{total_payes} / {total_samples}")
+    c2.metric("Marge Réelle", f"{marge_reelle:.2f} €")
+    c3.metric("Bouteille payée ?", "OUI" if marge_reelle >= 0 else "NON", delta_color="normal")
 
 # 4. STOCK RESTANT
-with tab4:
+@profil.chrono("📦 Stock")
+def afficher_stock():
     st.header("📦 Stock Invendu (Samples)")
-    rows = []
-    tot_val = 0
-    for m, d in st.session_state.mois_data.items():
-        if d["nom_bouteille"]:
-            vendus = sum(ad["qte"] for ad in d["adherents"].values())
-            preleves = RHUMOTHEQUE_PRELEVEMENT if m in st.session_state.rhumotheque and st.session_state.rhumotheque[m]["en_stock"] else 0
-            capa = max(CAPACITE_BOUTEILLE, vendus + preleves)
-            restant = capa - vendus - preleves
-            if restant > 0:
-                val = restant * d["prix_sample"]
-                tot_val += val
-                rows.append({"Mois": m, "Bouteille": d["nom_bouteille"], "Vendus": vendus, "Rhumothèque": preleves, "Restant": restant, "Valeur": f"{val:.2f} €"})
+    df, tot_val = analytique().stock()
     
     st.metric("Valeur Latente (Stock)", f"{tot_val:.2f} €")
-    if rows: st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    if len(df):
+        df.insert(1, "Bouteille", [st.session_state.mois_data[m]["nom_bouteille"] for m in df["Mois"]])
+        st.dataframe(df, column_config={"Valeur": st.column_config.NumberColumn(format="%.2f €")}, hide_index=True, use_container_width=True)
     else: st.info("Aucun stock dormant.")
 
 # 5. RHUMOTHÈQUE
-with tab5:
+@st.fragment
+@profil.chrono("🏛️ Fiche rhum")
+def carte_rhum(id_rhum):
+    charger_etat()
+    data = st.session_state.rhumotheque.get(id_rhum)
+    if data is None: return
+    with st.container(border=True):
+        # En-tête éditable
+        col_titre, col_del = st.columns([4, 1])
+        new_nom_edit = col_titre.text_input("Nom", value=data['nom'], key=f"rn_{id_rhum}")
+        
+        if col_del.button("🗑️", key=f"rd_{id_rhum}", help="Supprimer"):
+            del st.session_state.rhumotheque[id_rhum]
+            marquer("rhum", id_rhum)
+            st.rerun()
+        
+        # Détails
+        c_val, c_stock = st.columns(2)
+        new_val_edit = c_val.number_input("Valeur (€)", value=float(data.get('valeur', 0.0)), step=0.5, key=f"rv_{id_rhum}")
+        new_stock = c_stock.checkbox("En Stock", value=data.get("en_stock", True), key=f"rs_{id_rhum}")
+        
+        # Notes
+        new_notes = st.text_area("Notes", value=data.get("notes", ""), height=60, key=f"rnt_{id_rhum}")
+        
+        # Sauvegarde si changement détecté
+        if (new_nom_edit != data['nom'] or 
+            new_val_edit != data.get('valeur') or 
+            new_stock != data.get("en_stock") or 
+            new_notes != data.get("notes", "")):
+            
+            champs = {k for k, v in (("nom", new_nom_edit), ("valeur", new_val_edit), ("en_stock", new_stock), ("notes", new_notes)) if data.get(k) != v}
+            data["nom"] = new_nom_edit
+            data["valeur"] = new_val_edit
+            data["en_stock"] = new_stock
+            data["notes"] = new_notes
+            marquer("rhum", id_rhum, champs=champs)
+            # Rerun complet peu coûteux : une seule page du catalogue est affichée
+            st.rerun()
+
+@profil.chrono("🏛️ Rhumothèque")
+def afficher_rhumotheque():
     st.header("🏛️ Rhumothèque (Archives & Cave)")
     
     # --- FORMULAIRE D'AJOUT MANUEL ---
@@ -415,7 +560,8 @@ with tab5:
                     "valeur": new_val,
                     "notes": ""
                 }
-                sauvegarder_etat()
+                marquer("rhum", new_id)
+                st.session_state.rhum_sel = new_id
                 st.success(f"✅ {new_nom} ajouté !")
                 st.rerun()
             else:
@@ -423,65 +569,262 @@ with tab5:
 
     st.markdown("---")
 
-    # --- LISTE DES BOUTEILLES ---
-    rhumo_list = []
-    tot_val_rhumo = 0
-    
-    # On récupère toutes les entrées (auto + manuelles)
-    keys_to_delete = []
-    
-    # Affichage en grille (3 par ligne)
-    cols = st.columns(3)
-    
-    for i, (id_rhum, data) in enumerate(st.session_state.rhumotheque.items()):
-        # Nettoyage des entrées vides éventuelles
-        if not data.get("nom"): continue
-        
-        with cols[i % 3]:
-            with st.container(border=True):
-                # En-tête éditable
-                col_titre, col_del = st.columns([4, 1])
-                new_nom_edit = col_titre.text_input("Nom", value=data['nom'], key=f"rn_{id_rhum}")
-                
-                if col_del.button("🗑️", key=f"rd_{id_rhum}", help="Supprimer"):
-                    keys_to_delete.append(id_rhum)
-                
-                # Détails
-                c_val, c_stock = st.columns(2)
-                new_val_edit = c_val.number_input("Valeur (€)", value=float(data.get('valeur', 0.0)), step=0.5, key=f"rv_{id_rhum}")
-                new_stock = c_stock.checkbox("En Stock", value=data.get("en_stock", True), key=f"rs_{id_rhum}")
-                
-                # Notes
-                new_notes = st.text_area("Notes", value=data.get("notes", ""), height=60, key=f"rnt_{id_rhum}")
-                
-                # Sauvegarde si changement détecté
-                if (new_nom_edit != data['nom'] or 
-                    new_val_edit != data.get('valeur') or 
-                    new_stock != data.get("en_stock") or 
-                    new_notes != data.get("notes", "")):
-                    
-                    st.session_state.rhumotheque[id_rhum]["nom"] = new_nom_edit
-                    st.session_state.rhumotheque[id_rhum]["valeur"] = new_val_edit
-                    st.session_state.rhumotheque[id_rhum]["en_stock"] = new_stock
-                    st.session_state.rhumotheque[id_rhum]["notes"] = new_notes
-                    sauvegarder_etat()
-                    st.rerun()
-                
-                # Calcul total
-                if data.get("en_stock", True):
-                    rhumo_list.append(data)
-                    tot_val_rhumo += data.get("valeur", 0.0)
-
-    # Suppression effective après la boucle pour ne pas casser l'itération
-    if keys_to_delete:
-        for k in keys_to_delete:
-            del st.session_state.rhumotheque[k]
-        sauvegarder_etat()
-        st.rerun()
+    # --- CATALOGUE : recherche + filtres, une page à la fois ---
+    index = partage.table("index_rhum", lambda: IndexRhum(partage.etat["rhumotheque"]))
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    texte = c1.text_input("🔎 Rechercher (nom, notes)", key="rhum_q")
+    stock = c2.selectbox("Stock", ["Tous", "En stock", "Sortie"], key="rhum_stock")
+    mois_f = c3.selectbox("Mois", ["Tous"] + list(st.session_state.mois_data.keys()) + ["Autre"], key="rhum_mois")
+    val_min = c4.number_input("Valeur min (€)", min_value=0.0, step=5.0, key="rhum_vmin")
+    ids = index.rechercher(texte, en_stock={"Tous": None, "En stock": True, "Sortie": False}[stock],
+                           mois=None if mois_f == "Tous" else mois_f, valeur_min=val_min or None)
+
+    nb_pages = max(1, -(-len(ids) // RHUM_PAR_PAGE))
+    if st.session_state.get("rhum_page", 1) > nb_pages: st.session_state.rhum_page = 1
+    page = st.number_input(f"Page (sur {nb_pages}) — {len(ids)} bouteille(s)", min_value=1, max_value=nb_pages, step=1, key="rhum_page") if nb_pages > 1 else 1
+    page_ids = ids[(page - 1) * RHUM_PAR_PAGE:page * RHUM_PAR_PAGE]
+    rh = st.session_state.rhumotheque
+    tableau = pd.DataFrame([{"Nom": rh[i]["nom"], "Mois": index.fiches[i][2], "En Stock": rh[i].get("en_stock", True), "Valeur": rh[i].get("valeur", 0.0), "Notes": rh[i].get("notes", "")} for i in page_ids])
+    if page_ids:
+        choix = st.dataframe(tableau, column_config={"Valeur": st.column_config.NumberColumn(format="%.2f €")}, hide_index=True, use_container_width=True,
+                             on_select="rerun", selection_mode="single-row", key=f"rhum_table_{page}")
+        if choix.selection.rows: st.session_state.rhum_sel = page_ids[choix.selection.rows[0]]
+    else: st.info("Aucune bouteille ne correspond.")
+
+    # Widgets d'édition uniquement pour la bouteille sélectionnée
+    if st.session_state.get("rhum_sel") in rh: carte_rhum(st.session_state.rhum_sel)
+    elif page_ids: st.caption("Sélectionnez une bouteille dans la liste pour la modifier.")
 
     st.markdown("---")
     # --- BILAN ---
+    nb_rhumo, tot_val_rhumo = analytique().rhumotheque()
     c1, c2 = st.columns(2)
-    c1.metric("Bouteilles en Stock", len(rhumo_list))
+    c1.metric("Bouteilles en Stock", nb_rhumo)
     c2.metric("Valeur Totale Rhumothèque", f"{tot_val_rhumo:.2f} €")
 
+# 6. RELEVÉS PAR ADHÉRENT
+@profil.chrono("🧾 Relevés")
+def afficher_releves():
+    st.header("🧾 Relevés par adhérent")
+    df = analytique().releves()
+    seulement_dus = st.checkbox("Seulement les adhérents avec un reste à payer", value=True, key="releves_dus")
+    if seulement_dus: df = df[df["Reste"] > 0]
+    c1, c2 = st.columns(2)
+    c1.metric("Reste à encaisser", f"{df['Reste'].sum():.2f} €")
+    c2.metric("Adhérents concernés", int((df["Reste"] > 0).sum()))
+    euros = st.column_config.NumberColumn(format="%.2f €")
+    st.dataframe(df.sort_values("Reste", ascending=False), column_config={c: euros for c in df.columns if c != "Samples"}, use_container_width=True)
+
+# 7. RAPPROCHEMENT BANCAIRE
+@profil.chrono("🏦 Rapprochement")
+def afficher_rapprochement():
+    st.header("🏦 Rapprochement bancaire")
+    up = st.file_uploader("Relevé bancaire (CSV : Date, Libellé, Montant ou Crédit)", type=["csv"], key="releve_banque")
+    if not up: return
+    # Propositions calculées une fois par relevé (et après chaque enregistrement) : une écriture
+    # d'une autre session ne doit pas remettre à zéro la revue en cours ; `appliquer` ignore les postes réglés entre-temps
+    h = empreinte(up)
+    calcul = st.session_state.get("rapprochement")
+    if calcul is None or calcul[0] != h:
+        try:
+            with profil.section("rapprochement › calcul"):
+                propositions = rapprocher(lire_releve(up), partage.etat, partage.gratuits)
+        except ValueError as e:
+            st.error(f"Relevé illisible : {e}")
+            return
+        calcul = st.session_state.rapprochement = (h, propositions)
+        st.session_state.rapprochement_revue = st.session_state.get("rapprochement_revue", 0) + 1
+    propositions = calcul[1]
+
+    trouves = [p for p in propositions if p["postes"]]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Virements reçus", len(propositions))
+    c2.metric("Rapprochés", len(trouves))
+    c3.metric("Montant rapproché", f"{sum(p['montant'] for p in trouves):.2f} €")
+    if not propositions: return
+
+    df = pd.DataFrame([{"Appliquer": p["correspondance"] == "exact" and bool(p["postes"]), "Date": p["date"], "Libellé": p["libelle"], "Montant": p["montant"],
+                        "Adhérent": p["nom"] or "", "Postes": " + ".join(d[1] for d in p["postes"]), "Correspondance": p["correspondance"]} for p in propositions])
+    cle = f"rapprochement_{h}_{st.session_state.rapprochement_revue}"
+    st.data_editor(df, key=cle, hide_index=True, use_container_width=True, height=500, disabled=[c for c in df.columns if c != "Appliquer"],
+                   column_config={"Appliquer": st.column_config.CheckboxColumn("Appliquer ?"), "Montant": st.column_config.NumberColumn(format="%.2f €")})
+    # Choix de l'utilisateur par ligne du relevé (cases par défaut, puis cases modifiées)
+    choix = st.session_state.rapprochement_choix = {p["ligne"]: bool(ok) for p, ok in zip(propositions, df["Appliquer"])}
+    for i, cols in st.session_state[cle]["edited_rows"].items():
+        if "Appliquer" in cols: choix[propositions[int(i)]["ligne"]] = bool(cols["Appliquer"])
+    postes = [d[0] for p in propositions if choix[p["ligne"]] for d in p["postes"]]
+    if st.button(f"✅ Enregistrer les règlements retenus ({len(postes)} poste(s))", disabled=not postes, key="rapprochement_ok"):
+        # Une seule transaction pour tout le relevé ; le grand livre suit par deltas
+        etat = partage.etat
+        entites = appliquer(etat, partage.livre, postes)
+        if entites:
+            sauvegarder(partage.ecritures.ecrire, etat, entites)
+            signaler(entites)
+        st.session_state.rapprochement_fait = len(entites)
+        del st.session_state["rapprochement"]  # postes réglés : nouvelles propositions, nouvelle revue
+        st.rerun()
+    if "rapprochement_fait" in st.session_state: st.success(f"✅ {st.session_state.pop('rapprochement_fait')} règlement(s) enregistré(s)")
+
+# 8. OPÉRATIONS GROUPÉES (une écriture par opération, annulable)
+def enregistrer_lot(etat, lot):
+    if lot:
+        sauvegarder(partage.ecritures.ecrire, etat, lot.entites)
+        signaler(lot.entites)
+        pile = st.session_state.setdefault("lots", [])
+        pile.append(lot)
+        del pile[:-ANNULATIONS]
+    st.session_state.lot_fait = f"{lot.libelle} — {len(lot)} modification(s)" if lot else "Aucune modification : tout est déjà à jour."
+    st.rerun()
+
+@profil.chrono("🧰 Opérations groupées")
+def afficher_lots():
+    st.header("🧰 Opérations groupées")
+    if "lot_fait" in st.session_state: st.success(st.session_state.pop("lot_fait"))
+    etat, livre, mois_s = partage.etat, partage.livre, list(st.session_state.mois_data)
+
+    # Sélection des adhérents : masques NumPy sur les matrices de l'analytique
+    c1, c2, c3, c4 = st.columns(4)
+    adh = c1.selectbox("Adhésion", ["Toutes", "Réglée", "Non réglée"], key="lot_f_adh")
+    mois_f = c2.selectbox("A commandé en", ["—"] + mois_s, key="lot_f_mois")
+    paye_f = c3.selectbox("Commande", ["Réglée ou non", "Réglée", "Non réglée"], key="lot_f_paye", disabled=mois_f == "—")
+    reste = c4.checkbox("Reste à payer", key="lot_f_reste")
+    noms = analytique().selectionner(adhesion={"Toutes": None, "Réglée": True, "Non réglée": False}[adh], mois=None if mois_f == "—" else mois_f,
+                                     paye_mois={"Réglée ou non": None, "Réglée": True, "Non réglée": False}[paye_f], reste=reste)
+    with st.expander(f"👥 {len(noms)} adhérent(s) sélectionné(s)"): st.write(", ".join(noms) or "—")
+
+    lot = None
+    t1, t2, t3 = st.tabs(["🥃 Samples", "💳 Adhésions", "🍽️ Dégustations"])
+    with t1:
+        c1, c2, c3 = st.columns(3)
+        source = c1.selectbox("Copier les commandes de", mois_s, key="lot_src")
+        cible = c2.selectbox("vers", mois_s, index=1, key="lot_dst")
+        ecraser = c3.checkbox("Remplacer les commandes existantes", key="lot_ecraser")
+        if st.button("📋 Copier pour la sélection", key="lot_copier", disabled=source == cible):
+            lot = copier_commandes(etat, livre, source, cible, noms, ecraser)
+        c1, c2, c3, c4 = st.columns(4)
+        mois = c1.selectbox("Mois", mois_s, key="lot_mois")
+        qte = c2.number_input("Quantité", min_value=0, max_value=10, value=1, key="lot_qte")
+        if c3.button("Fixer la quantité", key="lot_qte_ok"): lot = fixer(etat, livre, ("commande", mois), noms, qte=int(qte))
+        if c4.button("Marquer réglé", key="lot_mois_paye"): lot = fixer(etat, livre, ("commande", mois), noms, paye=True)
+    with t2:
+        c1, c2 = st.columns(2)
+        if c1.button("✅ Adhésions réglées", key="lot_adh_paye"): lot = fixer(etat, livre, ("adhesion",), noms, partage.gratuits, paye=True)
+        if c2.button("↩️ Adhésions non réglées", key="lot_adh_du"): lot = fixer(etat, livre, ("adhesion",), noms, partage.gratuits, paye=False)
+    with t3:
+        mois_d = st.radio("Dégustation", MOIS_DEGUSTATIONS, horizontal=True, key="lot_deg")
+        c1, c2, c3 = st.columns(3)
+        if c1.button("Inscrire la sélection", key="lot_deg_inscrire"): lot = fixer(etat, livre, ("participant", mois_d), noms, inscrit=True)
+        if c2.button("Marquer réglé", key="lot_deg_paye"): lot = fixer(etat, livre, ("participant", mois_d), noms, paye=True)
+        if c3.button("Désinscrire la sélection", key="lot_deg_desinscrire"): lot = fixer(etat, livre, ("participant", mois_d), noms, **PARTICIPANT_VIDE)
+        c1, c2 = st.columns(2)
+        autres = [m for m in MOIS_DEGUSTATIONS if m != mois_d]
+        source_d = c1.selectbox("Reprendre les inscrits de", autres, key="lot_deg_src")
+        if c1.button("📋 Reprendre", key="lot_deg_reporter"): lot = reporter_degustation(etat, livre, source_d, mois_d)
+        confirme = c2.checkbox(f"Confirmer : vider la dégustation de {mois_d}", key="lot_deg_confirme")
+        if c2.button("🗑️ Vider", key="lot_deg_vider", disabled=not confirme): lot = vider_degustation(etat, livre, mois_d)
+    if lot is not None: enregistrer_lot(etat, lot)
+
+    pile = st.session_state.get("lots", [])
+    if pile:
+        st.markdown("---")
+        st.caption("Dernières opérations : " + " · ".join(l.libelle for l in pile[::-1]))
+        if st.button(f"↩️ Annuler « {pile[-1].libelle} »", key="lot_annuler"):
+            inverse = annuler(etat, livre, pile.pop())
+            if inverse:
+                sauvegarder(partage.ecritures.ecrire, etat, inverse.entites)
+                signaler(inverse.entites)
+            st.session_state.lot_fait = f"{inverse.libelle} — {len(inverse)} modification(s)"
+            st.rerun()
+
+# 9. HISTORIQUE (saisons archivées, chargées seulement ici)
+@profil.chrono("📚 Historique")
+def afficher_historique():
+    st.header("📚 Historique des saisons")
+    archives = locataire.archives
+    annee = depot.annee()
+    tendance = archives.tendance_tresorerie() + [(annee, st.session_state.solde_depart, partage.livre.activite, st.session_state.solde_depart + partage.livre.activite)]
+    df_t = pd.DataFrame(tendance, columns=["Année", "Solde Départ", "Activité", "Caisse Finale"]).set_index("Année")
+    if len(df_t) > 1: st.line_chart(df_t[["Caisse Finale", "Activité"]])
+    st.dataframe(df_t, use_container_width=True)
+
+    if not archives.annees():
+        st.info("Aucune saison clôturée.")
+        return
+
+    with st.expander("🥃 Samples par adhérent et par année"):
+        if st.button("Calculer", key="hist_samples"):
+            spa = archives.samples_par_adherent(courant=(annee, partage.etat), noms={i: n for n, i in depot.registre().items()})
+            df_s = pd.DataFrame.from_dict(spa, orient="index").fillna(0).astype(int).sort_index()
+            df_s = df_s[sorted(df_s.columns)].rename(columns=str)
+            df_s["Total"] = df_s.sum(axis=1)
+            st.dataframe(df_s, use_container_width=True)
+
+    choix = st.selectbox("Consulter une saison", archives.annees()[::-1], key="hist_annee")
+    etat_a = archives.charger(choix)
+    resume = next(r for r in archives.index() if r["annee"] == choix)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Caisse Finale", f"{resume['caisse_finale']:.0f} €")
+    c2.metric("Adhésions payées", f"{resume['adhesions_payees']} / {resume['adherents']}")
+    c3.metric("Samples", resume["samples"])
+    st.dataframe(pd.DataFrame([{"Mois": m, "Bouteille": d["nom_bouteille"], "Samples": sum(v["qte"] for v in d["adherents"].values()), "Prix Achat": d["prix_achat"], "Prix Sample": d["prix_sample"]}
+                               for m, d in etat_a["mois_data"].items() if d["nom_bouteille"]]), hide_index=True, use_container_width=True)
+
+if section == SECTIONS[0]:
+    afficher_adhesions()
+
+elif section == SECTIONS[1]:
+    st.header("🍽️ Dégustations")
+    mois_deg = st.radio("Dégustation", MOIS_DEGUSTATIONS, horizontal=True, key="mois_deg")
+    afficher_degustation(mois_deg)
+
+elif section == SECTIONS[2]:
+    st.header("🥃 Samples Mensuels")
+    with st.expander("📊 Vue annuelle"):
+        st.dataframe(analytique().mois_kpi(), column_config={"CA": st.column_config.NumberColumn(format="%.2f €"), "Marge": st.column_config.NumberColumn(format="%.2f €")}, use_container_width=True)
+    mois_sel = st.radio("Mois", list(st.session_state.mois_data.keys()), horizontal=True, key="mois_samples")
+    afficher_mois(mois_sel)
+
+elif section == SECTIONS[3]:
+    afficher_stock()
+
+elif section == SECTIONS[4]:
+    afficher_rhumotheque()
+
+elif section == SECTIONS[5]:
+    afficher_releves()
+
+elif section == SECTIONS[6]:
+    afficher_rapprochement()
+
+elif section == SECTIONS[7]:
+    afficher_lots()
+
+else:
+    afficher_historique()
+
+# --- PROFIL (administrateur : serveur lancé avec RHUM_PROFIL et RHUM_PROFIL_ADMIN, mot de passe saisi dans la session) ---
+if profil.actif:
+    taille_etat = partage.table("taille_etat", lambda: len(json.dumps(partage.etat)))
+    if PROFIL_ADMIN and not st.session_state.get("profil_admin"):
+        with st.sidebar.expander("⏱️ Profil (administrateur)"):
+            with st.form("profil_connexion"):
+                mdp = st.text_input("Mot de passe administrateur", type="password")
+                if st.form_submit_button("🔓 Afficher"):
+                    if hash_password(mdp) == PROFIL_ADMIN:
+                        st.session_state.profil_admin = True
+                        st.rerun()
+                    else: st.error("❌ Incorrect")
+    elif PROFIL_ADMIN:
+        with st.sidebar.expander("⏱️ Profil des reruns"):
+            stats = depot.stats
+            c1, c2 = st.columns(2)
+            c1.metric("Taille de l'état", f"{taille_etat / 1024:.0f} Ko")
+            c2.metric("Écritures en attente", partage.ecritures.en_attente())
+            st.caption(f"Base : {stats['transactions']} transactions · {stats['lignes']} lignes et {stats['octets']} octets écrits · "
+                       f"{stats['secondes'] * 1000 / max(stats['transactions'], 1):.1f} ms/transaction · {partage.ecritures.fusions} fusions — "
+                       + " · ".join(f"{k} : {v}" for k, v in profil.compteurs.items()))
+            st.dataframe(pd.DataFrame(profil.percentiles()).round(1), hide_index=True, use_container_width=True)
+            if DOSSIER_ASSOCIATIONS:
+                st.caption(f"Associations en mémoire : {len(ouvrir_locataires().charges())} / {ASSOCIATIONS_EN_MEMOIRE} · {ouvrir_locataires().evictions} évictions")
+            if st.button("Remettre à zéro", key="profil_raz"): profil.reinitialiser()
+    profil.fin(section=section, etat_octets=taille_etat)
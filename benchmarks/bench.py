@@ -0,0 +1,234 @@
+"""Mesures de charge de app.py (AppTest, sans navigateur) et de la persistance.
+
+    python benchmarks/bench.py --adherents 50 500 5000 --annees 1 10 --sortie bench.json
+    python benchmarks/bench.py --adherents 50 500 --comparer bench_precedent.json
+
+Chaque échelle (adhérents × années de rhumothèque) tourne dans un
+sous-processus, dans un dossier temporaire : caches Streamlit, base et
+mémoire maximale propres à l'échelle. Le rapport JSON donne les durées en
+secondes ; `--comparer` signale les mesures plus lentes que le rapport de
+référence au-delà de `--seuil` et sort en erreur.
+"""
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RACINE)
+
+from generer import csv_adherents, csv_releve, generer_etat  # noqa: E402
+from rhum.export import ecrire_zip  # noqa: E402
+from rhum.import_csv import importer_adherents  # noqa: E402
+from rhum.metier import est_gratuit  # noqa: E402
+from rhum.rapprochement import lire_releve, rapprocher  # noqa: E402
+from rhum.stockage import DepotRhum  # noqa: E402
+from rhum.tresorerie import GrandLivre  # noqa: E402
+
+APP = os.path.join(RACINE, "app.py")
+MDP = "bench"
+NB_IMPORT = 200
+
+# Section -> action chronométrée après l'affichage : case d'un data_editor (clé, colonne),
+# case à cocher simple, fiche de la rhumothèque ou sous-onglet (radio des mois)
+SECTIONS = [
+    ("💳 Adhésions", [("editeur", "adh", "Payé")]),
+    ("🍽️ Dégustations", [("editeur", "deg_adh_Mars", "Inscrit"), ("radio", "mois_deg")]),
+    ("🥃 Samples Mensuels", [("editeur", "s_Février", "Payé"), ("radio", "mois_samples")]),
+    ("📦 Stock Restant", []),
+    ("🏛️ Rhumothèque", [("rhum",)]),
+    ("🧾 Relevés", [("case", "releves_dus")]),
+    ("🏦 Rapprochement", []),
+    ("🧰 Opérations groupées", [("case", "lot_f_reste")]),
+    ("📚 Historique", []),
+]
+
+
+# --- INJECTION DES MODIFICATIONS DE DATA_EDITOR ---
+# AppTest ne sait pas éditer un data_editor : l'état du widget est ajouté à la main
+# au format envoyé par le navigateur ({"edited_rows": ...}).
+EDITIONS = {}
+
+
+def _brancher_editions():
+    import streamlit.testing.v1.element_tree as et
+    origine = et.ElementTree.get_widget_states
+
+    def etats(self):
+        ws = origine(self)
+        for noeud in self:
+            if isinstance(noeud, et.Dataframe) and noeud.key in EDITIONS:
+                w = ws.widgets.add()
+                w.id = noeud.proto.id
+                w.string_value = json.dumps({"edited_rows": EDITIONS[noeud.key], "added_rows": [], "deleted_rows": []})
+        return ws
+    et.ElementTree.get_widget_states = etats
+
+
+# --- CHRONOMÉTRAGE ---
+def chrono(f):
+    t = time.perf_counter()
+    f()
+    return time.perf_counter() - t
+
+
+def mediane(repetitions, f):
+    return statistics.median(chrono(f) for _ in range(repetitions))
+
+
+def memoire_max_mo():
+    m = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(m / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def erreurs(at):
+    return [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+
+
+# --- MESURE D'UNE ÉCHELLE (sous-processus) ---
+def mesurer(nb_adherents, nb_annees, repetitions):
+    """Mesures d'une échelle dans un dossier temporaire, supprimé ensuite (répertoire courant restauré)."""
+    retour = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="rhum_bench_") as dossier:
+        os.chdir(dossier)
+        try: return _mesurer(nb_adherents, nb_annees, repetitions)
+        finally: os.chdir(retour)
+
+
+def _mesurer(nb_adherents, nb_annees, repetitions):
+    etat = generer_etat(nb_adherents, nb_annees)
+    with open("rhum_etat.json", "w", encoding="utf-8") as f:
+        json.dump(etat, f, ensure_ascii=False)
+    with open("rhum_mdp.json", "w") as f:
+        json.dump({"password_hash": hashlib.sha256(MDP.encode()).hexdigest()}, f)
+    fichier_csv = csv_adherents(NB_IMPORT)
+    t = {}
+
+    # Persistance et traitements, hors interface
+    t["migration_json"] = chrono(lambda: DepotRhum("rhum_etat.db", "rhum_etat.json"))
+    depot = DepotRhum("rhum_etat.db")
+    t["charger_etat"] = mediane(repetitions, depot.charger)
+    t["sauvegarde_complete"] = mediane(repetitions, lambda: depot.remplacer_etat(etat))
+    lot = {("commande", m, n): {"paye"} for m, d in etat["mois_data"].items() for n in list(d["adherents"])[:10]}
+    t["sauvegarde_entites"] = mediane(repetitions, lambda: depot.ecrire_entites(etat, lot))
+    t["import_csv"] = mediane(repetitions, lambda: importer_adherents(io.BytesIO(fichier_csv), etat["adherents_noms"]))
+    releve = csv_releve(etat)
+    t["rapprochement"] = mediane(repetitions, lambda: rapprocher(lire_releve(io.BytesIO(releve)), etat))
+    t["export_zip"] = mediane(repetitions, lambda: ecrire_zip(etat, GrandLivre(etat).activite, io.BytesIO()))
+
+    # Application complète
+    from streamlit.testing.v1 import AppTest
+    _brancher_editions()
+    noms = depot.charger()["adherents_noms"]
+    ligne = next(i for i, n in enumerate(noms) if not est_gratuit(n))
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.run()
+    at.text_input[0].input(MDP)
+    t["app_connexion"] = chrono(lambda: at.button[0].click().run())
+    t["app_rerun"] = mediane(repetitions, at.run)
+
+    for section, actions in SECTIONS:
+        t[f"app_section:{section}"] = chrono(lambda: at.radio(key="section").set_value(section).run())
+        for action in actions:
+            if action[0] == "editeur":
+                _, cle, colonne = action
+                df = next(d for d in at.dataframe if d.key == cle).value
+                EDITIONS[cle] = {str(ligne): {colonne: not bool(df[colonne].iloc[ligne])}}
+                t[f"app_case:{cle}"] = chrono(at.run)
+            elif action[0] == "radio":
+                r = at.radio(key=action[1])
+                t[f"app_sous_section:{action[1]}"] = chrono(lambda: r.set_value(r.options[1]).run())
+            elif action[0] == "case":
+                c = at.checkbox(key=action[1])
+                t[f"app_case:{action[1]}"] = chrono(lambda: c.set_value(not c.value).run())
+            elif action[0] == "rhum":
+                id_rhum = next(iter(etat["rhumotheque"]))
+                at.session_state["rhum_sel"] = id_rhum
+                at.run()
+                c = at.checkbox(key=f"rs_{id_rhum}")
+                t["app_case:rhum_en_stock"] = chrono(lambda: c.set_value(not c.value).run())
+
+    t["app_import_csv"] = chrono(lambda: at.file_uploader[0].set_value(("adherents.csv", fichier_csv, "text/csv")).run())
+    export = next(b for b in at.button if b.label.startswith("📦"))
+    t["app_export_zip"] = chrono(lambda: export.click().run())
+
+    return {"adherents": nb_adherents, "annees": nb_annees, "bouteilles": len(etat["rhumotheque"]),
+            "octets_json": os.path.getsize("rhum_etat.json"),
+            "mesures": {k: round(v, 4) for k, v in t.items()},
+            "adherents_apres_import": len(depot.charger()["adherents_noms"]),
+            "memoire_max_mo": memoire_max_mo(), "erreurs": erreurs(at)}
+
+
+# --- RAPPORT ---
+def comparer(rapport, reference, seuil):
+    """Lignes des mesures plus lentes que la référence de plus de `seuil` (0.2 = +20 %)."""
+    ref = {(e["adherents"], e["annees"]): e for e in reference["echelles"]}
+    regressions = []
+    for e in rapport["echelles"]:
+        r = ref.get((e["adherents"], e["annees"]))
+        if r is None: continue
+        for nom, v in e["mesures"].items():
+            avant = r["mesures"].get(nom)
+            if avant and v > avant * (1 + seuil) and v - avant > 0.01:
+                regressions.append(f"{e['adherents']} adh. × {e['annees']} an(s) · {nom} : {avant:.3f} s → {v:.3f} s")
+        if e["memoire_max_mo"] > r["memoire_max_mo"] * (1 + seuil):
+            regressions.append(f"{e['adherents']} adh. × {e['annees']} an(s) · mémoire : {r['memoire_max_mo']} Mo → {e['memoire_max_mo']} Mo")
+    return regressions
+
+
+def version_code():
+    try:
+        return subprocess.run(["git", "-C", RACINE, "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--adherents", type=int, nargs="+", default=[50, 500, 2000])
+    p.add_argument("--annees", type=int, nargs="+", default=[1, 10])
+    p.add_argument("--repetitions", type=int, default=3, help="répétitions des mesures hors interface (médiane)")
+    p.add_argument("--sortie", default="bench.json")
+    p.add_argument("--comparer", help="rapport de référence")
+    p.add_argument("--seuil", type=float, default=0.2)
+    p.add_argument("--mesure", type=int, nargs=2, help=argparse.SUPPRESS)  # usage interne : une échelle
+    a = p.parse_args()
+
+    if a.mesure:
+        print(json.dumps(mesurer(*a.mesure, a.repetitions)))
+        return 0
+
+    import streamlit
+    rapport = {"commit": version_code(), "date": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(), "streamlit": streamlit.__version__, "echelles": []}
+    for n, an in itertools.product(a.adherents, a.annees):
+        print(f"{n} adhérents × {an} an(s)...", file=sys.stderr)
+        r = subprocess.run([sys.executable, __file__, "--mesure", str(n), str(an), "--repetitions", str(a.repetitions)],
+                           capture_output=True, text=True)
+        if r.returncode:
+            sys.stderr.write(r.stderr)
+            return r.returncode
+        rapport["echelles"].append(json.loads(r.stdout.strip().splitlines()[-1]))
+    with open(a.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=1)
+
+    if a.comparer:
+        with open(a.comparer, encoding="utf-8") as f:
+            regressions = comparer(rapport, json.load(f), a.seuil)
+        for r in regressions: print(r)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
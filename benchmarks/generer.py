@@ -0,0 +1,100 @@
+"""Générateur déterministe d'états au format rhum_etat.json, pour les mesures de charge.
+
+    python benchmarks/generer.py --adherents 2000 --annees 10 --sortie rhum_etat.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rhum.metier import GRATUITS_VIE, MOIS_SAMPLES, RHUMOTHEQUE_PRELEVEMENT, etat_vide  # noqa: E402
+
+PRENOMS = ["Jean", "Marie", "Pierre", "Anne", "Louis", "Claire", "Paul", "Sophie", "Marc", "Julie", "Éric", "Hélène"]
+NOMS = ["MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY", "MOREAU", "SIMON", "LAURENT"]
+DISTILLERIES = ["Clément", "Saint-James", "Damoiseau", "J.M", "Neisson", "La Favorite", "Trois Rivières", "Depaz", "HSE", "Bielle"]
+STYLES = ["Blanc", "Ambré", "VSOP", "XO", "Hors d'Âge", "Brut de fût", "Single Cask", "Élevé sous bois"]
+NOTES = ["", "fruité", "vanillé", "boisé", "épicé, longue finale", "notes de canne fraîche"]
+
+
+def noms_adherents(n, graine=0):
+    """`n` noms uniques « NOM Prénom », plus les membres gratuits à vie."""
+    r = random.Random(graine)
+    noms = list(GRATUITS_VIE)
+    while len(noms) < n:
+        noms.append(f"{r.choice(NOMS)} {r.choice(PRENOMS)} {len(noms):05d}")
+    return noms[:max(n, len(GRATUITS_VIE))]
+
+
+def generer_etat(nb_adherents=50, nb_annees=1, graine=0):
+    """État complet : saison en cours remplie, et `nb_annees` années de rhumothèque."""
+    r = random.Random(graine)
+    etat = etat_vide()
+    noms = etat["adherents_noms"] = noms_adherents(nb_adherents, graine)
+    etat["solde_depart"] = round(r.uniform(500, 5000), 2)
+    etat["adhesions"] = {n: r.random() < 0.8 for n in noms}
+
+    for mois, d in etat["mois_data"].items():
+        d["nom_bouteille"] = f"{r.choice(DISTILLERIES)} {r.choice(STYLES)}"
+        d["prix_achat"] = float(r.randrange(30, 120))
+        d["prix_sample"] = float(r.randrange(4, 12))
+        d["adherents"] = {n: {"qte": r.randint(1, 3), "paye": r.random() < 0.7} for n in noms if r.random() < 0.3}
+
+    for d in etat["degustations"].values():
+        d["prix_bouteilles"] = float(r.randrange(100, 300, 5))
+        d["participants"] = {n: {"inscrit": True, "repas": r.random() < 0.6, "paye": r.random() < 0.75}
+                             for n in noms if r.random() < 0.25}
+        d["invites"] = [{"nom": f"Invité {i}", "repas": r.random() < 0.5, "paye": r.random() < 0.5}
+                        for i in range(r.randint(0, 4))]
+
+    # Rhumothèque : les bouteilles des mois de la saison (id = mois, comme l'app) et celles des années passées
+    for mois, d in etat["mois_data"].items():
+        etat["rhumotheque"][mois] = {"nom": d["nom_bouteille"], "en_stock": True, "notes": "",
+                                     "valeur": d["prix_sample"] * RHUMOTHEQUE_PRELEVEMENT}
+    for a in range(1, nb_annees):
+        for i, mois in enumerate(MOIS_SAMPLES + ["Autre"] * 3):
+            etat["rhumotheque"][f"manual_{a:02d}{i:02d}"] = {
+                "nom": f"{r.choice(DISTILLERIES)} {r.choice(STYLES)}", "mois_ref": mois,
+                "en_stock": r.random() < 0.4, "valeur": float(r.randrange(4, 40)), "notes": r.choice(NOTES)}
+    return etat
+
+
+def csv_adherents(n, graine=1):
+    """Fichier CSV d'import (bytes, ; cp1252 comme un export de tableur) de `n` adhérents."""
+    tampon = io.StringIO()
+    w = csv.writer(tampon, delimiter=";", lineterminator="\n")
+    w.writerow(["Nom", "Prénom"])
+    for nom in noms_adherents(n + len(GRATUITS_VIE), graine)[len(GRATUITS_VIE):]:
+        w.writerow(nom.split(" ", 1))
+    return tampon.getvalue().encode("cp1252")
+
+
+def csv_releve(etat, graine=2):
+    """Relevé bancaire (bytes, ; cp1252) : un virement par somme due non réglée, plus des opérations étrangères."""
+    r = random.Random(graine)
+    dus = [(n, 35.0) for n in etat["adherents_noms"] if not etat["adhesions"].get(n)]
+    dus += [(n, v["qte"] * d["prix_sample"]) for d in etat["mois_data"].values() for n, v in d["adherents"].items() if not v["paye"]]
+    tampon = io.StringIO()
+    w = csv.writer(tampon, delimiter=";", lineterminator="\n")
+    w.writerow(["Date", "Libellé", "Débit", "Crédit"])
+    for i, (nom, montant) in enumerate(dus):
+        nom, prenom = nom.split(" ", 1) if " " in nom else (nom, "")
+        libelle = r.choice([f"VIR SEPA {nom} {prenom}", f"VIREMENT DE M {prenom} {nom}", f"VIR INST {nom.lower()} cotisation"])
+        w.writerow([f"{1 + i % 28:02d}/{1 + i % 12:02d}/2026", libelle, "", f"{montant:.2f}".replace(".", ",")])
+        if r.random() < 0.1: w.writerow(["01/01/2026", "PRLV EDF", "-54,20", ""])
+    return tampon.getvalue().encode("cp1252", errors="replace")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--adherents", type=int, default=50)
+    p.add_argument("--annees", type=int, default=1)
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--sortie", default="rhum_etat.json")
+    a = p.parse_args()
+    with open(a.sortie, "w", encoding="utf-8") as f:
+        json.dump(generer_etat(a.adherents, a.annees, a.graine), f, ensure_ascii=False)
@@ -0,0 +1 @@
+"""Logique métier de l'application Gestion Rhum (sans dépendance Streamlit)."""
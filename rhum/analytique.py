@@ -0,0 +1,122 @@
+"""Indicateurs calculés sur des tableaux en colonnes (NumPy / pandas).
+
+Les commandes sont rangées dans deux matrices adhérent × mois (quantités,
+payé) accompagnées des vecteurs de prix par mois ; marges, stock invendu,
+valeur de la rhumothèque et relevés par adhérent sont ensuite obtenus en
+quelques opérations vectorisées.
+"""
+import numpy as np
+import pandas as pd
+
+from .metier import CAPACITE_BOUTEILLE, COTISATION, PRIX_DEGUSTATION, RHUMOTHEQUE_PRELEVEMENT, est_gratuit
+
+
+class Analytique:
+    def __init__(self, etat, gratuits=None):
+        self.mois = list(etat["mois_data"])
+        # Adhérents de la liste, puis ceux qui n'ont plus qu'une commande
+        noms = list(etat["adherents_noms"])
+        connus = set(noms)
+        for d in etat["mois_data"].values():
+            for n in d["adherents"]:
+                if n not in connus:
+                    connus.add(n)
+                    noms.append(n)
+        self.noms = noms
+        self.nb_liste = len(etat["adherents_noms"])  # les suivants ne sont plus dans la liste
+        ligne = {n: i for i, n in enumerate(noms)}
+
+        # Matrices adhérent × mois
+        self.qte = np.zeros((len(noms), len(self.mois)), dtype=np.int32)
+        self.paye = np.zeros((len(noms), len(self.mois)), dtype=bool)
+        for j, d in enumerate(etat["mois_data"].values()):
+            cmd = d["adherents"]
+            if not cmd: continue
+            idx = np.fromiter((ligne[n] for n in cmd), dtype=np.int64, count=len(cmd))
+            self.qte[idx, j] = np.fromiter((v["qte"] or 0 for v in cmd.values()), dtype=np.int32, count=len(cmd))
+            self.paye[idx, j] = np.fromiter((bool(v["paye"]) for v in cmd.values()), dtype=bool, count=len(cmd))
+
+        # Vecteurs par mois
+        md = etat["mois_data"].values()
+        self.prix_sample = np.array([d["prix_sample"] for d in md], dtype=float)
+        self.prix_achat = np.array([d["prix_achat"] for d in md], dtype=float)
+        self.bouteille = np.array([bool(d["nom_bouteille"]) for d in md])
+        rh = etat["rhumotheque"]
+        self.preleve = np.array([RHUMOTHEQUE_PRELEVEMENT if m in rh and rh[m].get("en_stock") else 0 for m in self.mois])
+
+        # Rhumothèque
+        self.rhum_en_stock = np.array([bool(r.get("en_stock", True)) and bool(r.get("nom")) for r in rh.values()], dtype=bool)
+        self.rhum_valeur = np.array([r.get("valeur", 0.0) or 0.0 for r in rh.values()], dtype=float)
+
+        # Adhésions et dégustations par adhérent
+        # Drapeaux précalculés du registre si fournis, sinon dérivés des noms
+        self.gratuit = np.array([n in gratuits if gratuits is not None else est_gratuit(n) for n in noms], dtype=bool)
+        self.adhesion = np.array([bool(etat["adhesions"].get(n, False)) for n in noms], dtype=bool)
+        self.deg_inscrit = np.zeros(len(noms), dtype=np.int32)
+        self.deg_paye = np.zeros(len(noms), dtype=np.int32)
+        for dg in etat["degustations"].values():
+            for n, p in dg["participants"].items():
+                if n in ligne and p.get("inscrit"):
+                    self.deg_inscrit[ligne[n]] += 1
+                    self.deg_paye[ligne[n]] += bool(p.get("paye"))
+
+    # --- SAMPLES ---
+    def mois_kpi(self):
+        """Commandés, payés, CA, marge et « bouteille payée ? » par mois."""
+        commandes = self.qte.sum(axis=0)
+        payes = (self.qte * self.paye).sum(axis=0)
+        ca = payes * self.prix_sample
+        marge = ca - self.prix_achat
+        return pd.DataFrame({"Commandés": commandes, "Payés": payes, "CA": ca, "Marge": marge,
+                             "Bouteille payée": marge >= 0}, index=pd.Index(self.mois, name="Mois"))
+
+    def stock(self):
+        """Stock invendu des bouteilles du mois : (DataFrame des mois avec reste, valeur latente totale)."""
+        vendus = self.qte.sum(axis=0)
+        capa = np.maximum(CAPACITE_BOUTEILLE, vendus + self.preleve)
+        restant = capa - vendus - self.preleve
+        valeur = restant * self.prix_sample
+        garde = self.bouteille & (restant > 0)
+        df = pd.DataFrame({"Mois": self.mois, "Vendus": vendus, "Rhumothèque": self.preleve,
+                           "Restant": restant, "Valeur": valeur})[garde]
+        return df, float(valeur[garde].sum())
+
+    # --- RHUMOTHÈQUE ---
+    def rhumotheque(self):
+        """(bouteilles en stock, valeur totale)."""
+        return int(self.rhum_en_stock.sum()), float(self.rhum_valeur[self.rhum_en_stock].sum())
+
+    # --- RELEVÉS PAR ADHÉRENT ---
+    def releves(self):
+        """Dû, réglé et reste à payer de chaque adhérent sur l'année (samples, adhésion, dégustations)."""
+        du_samples = self.qte @ self.prix_sample
+        regle_samples = (self.qte * self.paye) @ self.prix_sample
+        # Adhésion due par les seuls adhérents de la liste (pas par les anciens encore présents dans une commande)
+        membre = np.arange(len(self.noms)) < self.nb_liste
+        du_adh = np.where(membre & ~self.gratuit, COTISATION, 0)
+        regle_adh = np.where(membre & self.adhesion & ~self.gratuit, COTISATION, 0)
+        du_deg = self.deg_inscrit * PRIX_DEGUSTATION
+        regle_deg = self.deg_paye * PRIX_DEGUSTATION
+        du = du_samples + du_adh + du_deg
+        regle = regle_samples + regle_adh + regle_deg
+        return pd.DataFrame({"Samples": self.qte.sum(axis=1), "Dû Samples": du_samples, "Dû Adhésion": du_adh,
+                             "Dû Dégustations": du_deg, "Total Dû": du, "Réglé": regle, "Reste": du - regle},
+                            index=pd.Index(self.noms, name="Nom"))
+
+    # --- SÉLECTION D'ADHÉRENTS ---
+    def selectionner(self, adhesion=None, mois=None, paye_mois=None, reste=False):
+        """Adhérents de la liste vérifiant tous les critères (masques vectorisés).
+
+        adhesion : True / False (réglée ou non, gratuits exclus) ; mois :
+        a commandé ce mois, paye_mois : et sa commande est (True) ou non
+        (False) réglée ; reste : a un reste à payer sur l'année.
+        """
+        garde = np.zeros(len(self.noms), dtype=bool)
+        garde[:self.nb_liste] = True
+        if adhesion is not None: garde &= ~self.gratuit & (self.adhesion == adhesion)
+        if mois is not None:
+            j = self.mois.index(mois)
+            garde &= self.qte[:, j] > 0
+            if paye_mois is not None: garde &= self.paye[:, j] == paye_mois
+        if reste: garde &= self.releves()["Reste"].to_numpy() > 0
+        return [self.noms[i] for i in np.flatnonzero(garde)]
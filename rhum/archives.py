@@ -0,0 +1,117 @@
+"""Archives des saisons clôturées : une partition immuable par année.
+
+Chaque saison est écrite une seule fois dans `<dossier>/saison_<annee>.json.gz`
+(fichier temporaire lié à son nom final, en lecture seule), avec l'identifiant
+de registre de chaque nom pour suivre les renommages ; un petit index garde le
+résumé de chaque saison pour les tendances sans rien décompresser. Les
+partitions ne sont chargées qu'à la demande (vue Historique).
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from .stockage import ecrire_atomique
+
+
+class Archives:
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self._saisons = {}  # annee -> état chargé (les partitions ne changent jamais)
+        self._verrou = threading.Lock()
+        os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, annee):
+        return os.path.join(self.dossier, f"saison_{annee}.json.gz")
+
+    def _chemin_index(self):
+        return os.path.join(self.dossier, "index.json")
+
+    def index(self):
+        """Résumés des saisons archivées, triés par année."""
+        try:
+            with open(self._chemin_index(), "r", encoding="utf-8") as f: resumes = json.load(f)
+        except FileNotFoundError: return []
+        return sorted(resumes, key=lambda r: r["annee"])
+
+    def annees(self):
+        return [r["annee"] for r in self.index()]
+
+    def cloturer(self, annee, etat, activite, ids=None):
+        """Écrit la partition de `annee` ; refuse d'écraser une saison déjà archivée.
+
+        ids : {nom: identifiant} du registre (DepotRhum.registre) au moment de la clôture.
+        """
+        resume = {
+            "annee": annee,
+            "date_cloture": datetime.now().isoformat(timespec="seconds"),
+            "solde_depart": etat["solde_depart"],
+            "activite": activite,
+            "caisse_finale": etat["solde_depart"] + activite,
+            "adherents": len(etat["adherents_noms"]),
+            "adhesions_payees": sum(1 for p in etat["adhesions"].values() if p),
+            "samples": sum(v["qte"] for d in etat["mois_data"].values() for v in d["adherents"].values()),
+            "bouteilles_rhumotheque": sum(1 for r in etat["rhumotheque"].values() if r.get("en_stock")),
+        }
+        with self._verrou:
+            chemin = self._chemin(annee)
+            if os.path.exists(chemin): raise FileExistsError(chemin)
+            # Écrite à part puis liée à son nom (échoue si elle existe déjà) : jamais de partition tronquée
+            fd, tmp = tempfile.mkstemp(dir=self.dossier, suffix=".tmp")
+            try:
+                with open(fd, "wb") as brut, gzip.open(brut, "wt", encoding="utf-8") as f:
+                    json.dump({"resume": resume, "etat": etat, "ids": ids or {}}, f, ensure_ascii=False)
+                os.chmod(tmp, 0o444)
+                os.link(tmp, chemin)
+            finally:
+                os.remove(tmp)
+            resumes = [r for r in self.index() if r["annee"] != annee] + [resume]
+            ecrire_atomique(self._chemin_index(), json.dumps(resumes, ensure_ascii=False, indent=1).encode("utf-8"))
+        return resume
+
+    def annuler_cloture(self, annee):
+        """Retire la partition de `annee` quand la remise à zéro qui suit sa clôture a échoué."""
+        with self._verrou:
+            chemin = self._chemin(annee)
+            if os.path.exists(chemin):
+                os.chmod(chemin, 0o644)
+                os.remove(chemin)
+            ecrire_atomique(self._chemin_index(), json.dumps([r for r in self.index() if r["annee"] != annee],
+                                                             ensure_ascii=False, indent=1).encode("utf-8"))
+            self._saisons.pop(annee, None)
+
+    def _partition(self, annee):
+        # Décompressée une seule fois par processus
+        with self._verrou:
+            if annee not in self._saisons:
+                with gzip.open(self._chemin(annee), "rt", encoding="utf-8") as f:
+                    self._saisons[annee] = json.load(f)
+            return self._saisons[annee]
+
+    def charger(self, annee):
+        """État complet d'une saison archivée."""
+        return self._partition(annee)["etat"]
+
+    # --- REQUÊTES MULTI-SAISONS ---
+    def samples_par_adherent(self, courant=None, noms=None):
+        """{nom: {annee: samples commandés}} sur toutes les saisons (+ `courant` = (annee, etat)).
+
+        noms : {identifiant: nom actuel} du registre ; un adhérent renommé
+        depuis une clôture est compté sous son nom actuel.
+        """
+        saisons = [(a, p["etat"], p.get("ids", {})) for a, p in ((a, self._partition(a)) for a in self.annees())]
+        if courant: saisons.append((*courant, {}))
+        noms = noms or {}
+        res = {}
+        for annee, etat, ids in saisons:
+            for d in etat["mois_data"].values():
+                for nom, v in d["adherents"].items():
+                    nom = noms.get(ids.get(nom), nom)
+                    if v["qte"]: res.setdefault(nom, {}).setdefault(annee, 0); res[nom][annee] += v["qte"]
+        return res
+
+    def tendance_tresorerie(self):
+        """[(annee, solde_depart, activite, caisse_finale)] depuis l'index, sans charger les partitions."""
+        return [(r["annee"], r["solde_depart"], r["activite"], r["caisse_finale"]) for r in self.index()]
@@ -0,0 +1,137 @@
+"""Traitements en lot, sans Streamlit : bilan, export ZIP et validation de fichiers d'état.
+
+    python -m rhum bilan sections/*/rhum_etat.json --csv bilans.csv
+    python -m rhum export sections/*/rhum_etat.json --dossier exports
+    python -m rhum valider sections/*/rhum_etat.json --json
+
+Accepte les anciens fichiers rhum_etat.json comme les bases rhum_etat.db.
+Les fichiers sont répartis sur un pool de processus (--processus). L'export
+écrit un ZIP par section : des fichiers de même section sont refusés.
+"""
+import argparse
+import csv
+import functools
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .export import ecrire_zip
+from .tresorerie import bilan
+from .validation import valider
+
+
+def charger(chemin):
+    if chemin.endswith(".db"):
+        if not os.path.exists(chemin): raise FileNotFoundError(chemin)
+        import sqlite3  # seulement pour les bases
+        from .stockage import lire_etat
+        # Lecture seule : ni schéma ni migration appliqués aux bases des sections
+        c = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+        try:
+            if "nom" in [col[1] for col in c.execute("PRAGMA table_info(commandes)")]:
+                raise ValueError("base à l'ancien schéma : l'ouvrir une fois dans l'application pour la migrer")
+            return lire_etat(c)
+        finally: c.close()
+    with open(chemin, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def nom_section(chemin):
+    """Nom du dossier pour les fichiers nommés rhum_etat.*, sinon nom du fichier."""
+    base = os.path.splitext(os.path.basename(chemin))[0]
+    return os.path.basename(os.path.dirname(os.path.abspath(chemin))) if base == "rhum_etat" else base
+
+
+def sections_en_double(fichiers):
+    """Résultats en erreur des fichiers dont la section (nom de l'export) est aussi celle d'un autre fichier."""
+    par_section = {}
+    for f in fichiers: par_section.setdefault(nom_section(f), []).append(f)
+    return {f: {"fichier": f, "section": s, "avertissements": [],
+                "erreurs": [f"section {s} en double ({', '.join(autres)}) : {s}.zip serait écrasé"]}
+            for s, autres in par_section.items() if len(autres) > 1 for f in autres}
+
+
+def traiter(commande, chemin, dossier=None):
+    """Résultat (dict sérialisable) de `commande` sur un fichier ; exécuté dans un processus du pool."""
+    r = {"fichier": chemin, "section": nom_section(chemin)}
+    try:
+        etat = charger(chemin)
+    except Exception as e:
+        r.update(erreurs=[f"lecture impossible : {e}"], avertissements=[])
+        return r
+    r["erreurs"], r["avertissements"] = valider(etat)
+    if r["erreurs"] or commande == "valider": return r
+
+    b = bilan(etat)
+    if commande == "bilan":
+        r["bilan"] = b
+    else:
+        from .stockage import ecrire_atomique
+        tampon = io.BytesIO()
+        ecrire_zip(etat, b["activite"], tampon)
+        r["export"] = os.path.join(dossier, f"{r['section']}.zip")
+        ecrire_atomique(r["export"], tampon.getvalue())
+    return r
+
+
+def afficher(r):
+    etat = "ERREUR" if r["erreurs"] else "ok"
+    if "bilan" in r:
+        b = r["bilan"]
+        detail = f"caisse finale {b['caisse_finale']:.2f} € (activité {b['activite']:+.2f} €, {b['adherents']} adhérents)"
+    elif "export" in r:
+        detail = r["export"]
+    else:
+        detail = f"{len(r['erreurs'])} erreur(s), {len(r['avertissements'])} avertissement(s)"
+    print(f"[{etat}] {r['section']} — {detail}")
+    for e in r["erreurs"]: print(f"    ✗ {e}")
+
+
+def ecrire_csv(chemin, resultats):
+    """Bilans de toutes les sections dans un seul CSV (;)."""
+    lignes = [r for r in resultats if "bilan" in r]
+    if not lignes: return
+    colonnes = list(lignes[0]["bilan"])
+    with open(chemin, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";", lineterminator="\n")
+        w.writerow(["Section", "Fichier"] + colonnes)
+        w.writerows([r["section"], r["fichier"]] + [r["bilan"][c] for c in colonnes] for r in lignes)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m rhum", description=__doc__.splitlines()[0])
+    sous = p.add_subparsers(dest="commande", required=True)
+    for nom, aide in (("bilan", "bilan de l'année de chaque fichier"),
+                      ("export", "archive ZIP de l'année de chaque fichier"),
+                      ("valider", "contrôle de structure de chaque fichier")):
+        sp = sous.add_parser(nom, help=aide)
+        sp.add_argument("fichiers", nargs="+")
+        sp.add_argument("--processus", type=int, default=None, help="taille du pool (défaut : nombre de CPU)")
+        sp.add_argument("--json", action="store_true", help="un résultat JSON par ligne")
+        if nom == "bilan": sp.add_argument("--csv", help="écrit aussi tous les bilans dans ce fichier")
+        if nom == "export": sp.add_argument("--dossier", default="exports")
+    a = p.parse_args(argv)
+
+    dossier = getattr(a, "dossier", None)
+    if dossier: os.makedirs(dossier, exist_ok=True)
+    # Un ZIP par section : deux fichiers de même section ne sont pas exportés
+    doubles = sections_en_double(a.fichiers) if a.commande == "export" else {}
+    fichiers = [f for f in a.fichiers if f not in doubles]
+    travail = functools.partial(traiter, a.commande, dossier=dossier)
+    if len(fichiers) <= 1 or a.processus == 1:
+        resultats = list(map(travail, fichiers))
+    else:
+        n = a.processus or os.cpu_count() or 1
+        with ProcessPoolExecutor(n) as pool:
+            resultats = list(pool.map(travail, fichiers, chunksize=max(1, len(fichiers) // (4 * n))))
+    faits = iter(resultats)
+    resultats = [doubles[f] if f in doubles else next(faits) for f in a.fichiers]
+
+    for r in resultats:
+        if a.json: print(json.dumps(r, ensure_ascii=False))
+        else: afficher(r)
+    if getattr(a, "csv", None): ecrire_csv(a.csv, resultats)
+    en_erreur = sum(1 for r in resultats if r["erreurs"])
+    if not a.json: print(f"{len(resultats)} fichier(s), {en_erreur} en erreur")
+    return 1 if en_erreur else 0
@@ -0,0 +1,90 @@
+"""Export annuel (ZIP de CSV) écrit en flux dans un fichier temporaire.
+
+Chaque section est écrite ligne à ligne par un csv.writer directement dans
+l'entrée du ZIP, lui-même construit dans un SpooledTemporaryFile (mémoire
+puis disque au-delà de SEUIL_MEMOIRE). Seule l'archive compressée est gardée,
+en cache tant que la version de l'état ne change pas.
+"""
+import csv
+import io
+import tempfile
+import threading
+import zipfile
+
+from .metier import est_gratuit, retirer_accents
+
+SEUIL_MEMOIRE = 2 * 1024 * 1024
+
+
+def _section(z, nom):
+    flux = io.TextIOWrapper(z.open(nom, "w"), encoding="utf-8", newline="")
+    return flux, csv.writer(flux, delimiter=";", lineterminator="\n")
+
+
+def _oui(v): return "OUI" if v else "NON"
+
+
+def ecrire_zip(etat, activite, fichier):
+    """Écrit l'archive de l'année dans `fichier` (objet binaire ouvert en écriture)."""
+    ra = retirer_accents
+    with zipfile.ZipFile(fichier, "w", zipfile.ZIP_DEFLATED) as z:
+        # Bilan
+        flux, w = _section(z, "00_Bilan.csv")
+        with flux:
+            w.writerows([["Solde Depart", etat["solde_depart"]], ["Activite", activite],
+                         ["Caisse Finale", etat["solde_depart"] + activite]])
+
+        # Adhésions
+        if etat["adherents_noms"]:
+            flux, w = _section(z, "Adhesions.csv")
+            with flux:
+                w.writerow(["Nom", "Gratuit", "Paye"])
+                for n in etat["adherents_noms"]:
+                    w.writerow([ra(n), _oui(est_gratuit(n)), _oui(etat["adhesions"].get(n, False))])
+
+        # Samples
+        for m, d in etat["mois_data"].items():
+            if not any(v["qte"] > 0 for v in d["adherents"].values()): continue
+            flux, w = _section(z, f"Samples_{ra(m)}.csv")
+            with flux:
+                w.writerows([["Mois", ra(m)], ["Bouteille", ra(d["nom_bouteille"])], [], ["Nom", "Samples", "Paye"]])
+                for n, v in d["adherents"].items():
+                    if v["qte"] > 0: w.writerow([ra(n), v["qte"], _oui(v["paye"])])
+
+        # Dégustations
+        for m, dg in etat["degustations"].items():
+            inscrits = [(n, p) for n, p in dg["participants"].items() if p.get("inscrit")]
+            if not inscrits and not dg["invites"]: continue
+            flux, w = _section(z, f"Degustation_{ra(m)}.csv")
+            with flux:
+                w.writerows([["Mois", ra(m)], ["Prix Bouteilles", dg.get("prix_bouteilles", 0.0)], [], ["Nom", "Type", "Repas", "Paye"]])
+                for n, p in inscrits: w.writerow([ra(n), "Adherent", _oui(p.get("repas")), _oui(p.get("paye"))])
+                for i in dg["invites"]: w.writerow([ra(i.get("nom", "")), "Invite", _oui(i.get("repas")), _oui(i.get("paye"))])
+
+        # Rhumothèque
+        if etat["rhumotheque"]:
+            flux, w = _section(z, "Rhumotheque.csv")
+            with flux:
+                w.writerow(["Mois", "Bouteille", "En Stock", "Valeur", "Notes"])
+                for m, rd in etat["rhumotheque"].items():
+                    if rd.get("en_stock", False):
+                        w.writerow([ra(m), ra(rd["nom"]), "OUI", rd["valeur"], ra(rd.get("notes", ""))])
+
+
+class CacheArchive:
+    """Dernière archive construite, réutilisée tant que la clé (version de l'état) est la même."""
+
+    def __init__(self):
+        self._cle = None
+        self._contenu = None
+        self._verrou = threading.Lock()
+
+    def obtenir(self, cle, etat, activite):
+        """Contenu de l'archive pour la version `cle` ; le même objet bytes est rendu à chaque appel."""
+        with self._verrou:
+            if self._cle != cle:
+                with tempfile.SpooledTemporaryFile(max_size=SEUIL_MEMOIRE) as fichier:
+                    ecrire_zip(etat, activite, fichier)
+                    fichier.seek(0)
+                    self._cle, self._contenu = cle, fichier.read()
+            return self._contenu
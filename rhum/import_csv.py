@@ -0,0 +1,94 @@
+"""Import en flux d'une liste d'adhérents (CSV Nom;Prénom avec en-tête).
+
+Le fichier est lu ligne à ligne sur son tampon (pas de copie complète en
+mémoire), l'encodage et le séparateur sont détectés, et les noms sont
+fusionnés dans la liste existante via un index de noms normalisés.
+"""
+import codecs
+import csv
+import hashlib
+import io
+
+from .metier import cle_nom
+
+TAILLE_ECHANTILLON = 64 * 1024
+SEPARATEURS = ";,\t|"
+ENCODAGES = ("utf-8", "cp1252")
+
+
+def empreinte(fichier):
+    """SHA-256 du contenu, lu par blocs ; le curseur est remis au début."""
+    h = hashlib.sha256()
+    fichier.seek(0)
+    for bloc in iter(lambda: fichier.read(TAILLE_ECHANTILLON), b""): h.update(bloc)
+    fichier.seek(0)
+    return h.hexdigest()
+
+
+def detecter_encodage(echantillon):
+    if echantillon.startswith(codecs.BOM_UTF8): return "utf-8-sig"
+    for enc in ENCODAGES:
+        try:
+            # final=False : un caractère coupé en fin d'échantillon n'est pas une erreur
+            codecs.getincrementaldecoder(enc)().decode(echantillon, final=False)
+            return enc
+        except UnicodeDecodeError: continue
+    return "latin-1"
+
+
+def detecter_separateur(texte):
+    # Le séparateur le plus présent dans la ligne d'en-tête (";" par défaut)
+    entete = texte.splitlines()[0] if texte else ""
+    compte = {s: entete.count(s) for s in SEPARATEURS}
+    meilleur = max(SEPARATEURS, key=compte.get)
+    return meilleur if compte[meilleur] else ";"
+
+
+def lire_csv(fichier, lire):
+    """Renvoie lire(reader, encodage, separateur) sur le CSV binaire `fichier`, décodé strictement.
+
+    L'encodage est détecté sur l'échantillon ; si la suite du fichier ne s'y
+    décode pas, la lecture reprend depuis le début en cp1252 puis latin-1.
+    """
+    fichier.seek(0)
+    echantillon = fichier.read(TAILLE_ECHANTILLON)
+    for encodage in dict.fromkeys((detecter_encodage(echantillon), "cp1252", "latin-1")):
+        fichier.seek(0)
+        # Le séparateur ne dépend que de l'en-tête (un caractère coupé en fin d'échantillon est ignoré)
+        separateur = detecter_separateur(echantillon.decode(encodage, errors="ignore"))
+        texte = io.TextIOWrapper(fichier, encoding=encodage, newline="")
+        try:
+            return lire(csv.reader(texte, delimiter=separateur), encodage, separateur)
+        except UnicodeDecodeError:
+            continue
+        finally:
+            texte.detach()  # ne pas fermer le tampon de l'uploader
+
+
+def importer_adherents(fichier, existants):
+    """Fusionne les adhérents du CSV binaire `fichier` dans la liste `existants`.
+
+    Renvoie un rapport {"ajoutes": [noms], "doublons": int, "rejetes": [(ligne, raison)],
+    "encodage": str, "separateur": str}.
+    """
+    def lire(reader, encodage, separateur):
+        index = {cle_nom(n) for n in existants}
+        rapport = {"ajoutes": [], "doublons": 0, "rejetes": [], "encodage": encodage, "separateur": separateur}
+        next(reader, None)  # En-tête
+        for r in reader:
+            if not any(c.strip() for c in r): continue
+            if len(r) < 2:
+                rapport["rejetes"].append((reader.line_num, "colonne Prénom manquante"))
+                continue
+            if not (r[0].strip() or r[1].strip()):
+                rapport["rejetes"].append((reader.line_num, "nom et prénom vides"))
+                continue
+            nom = f"{r[0].strip().upper()} {r[1].strip().title()}".strip()
+            cle = cle_nom(nom)
+            if cle in index:
+                rapport["doublons"] += 1
+                continue
+            index.add(cle)
+            rapport["ajoutes"].append(nom)
+        return rapport
+    return lire_csv(fichier, lire)
@@ -0,0 +1,87 @@
+"""Mode multi-associations : un dossier par association, états chargés gardés dans un LRU.
+
+    <dossier>/<association>/rhum_etat.db, rhum_mdp.json, rhum_archives/
+
+Seules les `capacite` associations utilisées le plus récemment restent en
+mémoire. Une association évincée écrit d'abord ses modifications en
+attente ; elle est rechargée depuis sa base (rapide : SQLite) à la
+prochaine connexion.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from .archives import Archives
+from .export import CacheArchive
+from .partage import EtatPartage
+from .stockage import DepotRhum
+
+FICHIER_ETAT = "rhum_etat.json"  # Ancien format, migré une fois vers FICHIER_BASE
+FICHIER_BASE = "rhum_etat.db"
+DOSSIER_ARCHIVES = "rhum_archives"  # Une partition par saison clôturée
+NOM_VALIDE = re.compile(r"^\w[\w .-]*$")
+
+
+class Locataire:
+    """Ce qui est propre à une association : dépôt, état partagé, archives et cache d'export."""
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        # Schéma + migration unique de rhum_etat.json au premier lancement
+        self.depot = DepotRhum(os.path.join(dossier, FICHIER_BASE), os.path.join(dossier, FICHIER_ETAT))
+        self.partage = EtatPartage(self.depot)
+        self.archives = Archives(os.path.join(dossier, DOSSIER_ARCHIVES))
+        self.export = CacheArchive()
+
+    def fermer(self):
+        self.partage.ecritures.arreter()
+        self.depot.fermer()
+
+
+class Locataires:
+    def __init__(self, dossier, capacite=16):
+        self.dossier = dossier
+        self.capacite = capacite
+        self.evictions = 0
+        self._charges = OrderedDict()  # nom -> Locataire, du moins au plus récemment utilisé
+        self._verrou = threading.Lock()
+        self._chargements = {}  # nom -> verrou d'ouverture en cours
+
+    def liste(self):
+        """Associations disponibles (sous-dossiers de `dossier`)."""
+        return sorted(n for n in os.listdir(self.dossier)
+                      if NOM_VALIDE.match(n) and os.path.isdir(os.path.join(self.dossier, n)))
+
+    def chemin(self, nom):
+        # Le nom vient de l'interface : jamais de chemin hors de `dossier`
+        if not NOM_VALIDE.match(nom) or not os.path.isdir(os.path.join(self.dossier, nom)):
+            raise KeyError(f"Association inconnue : {nom}")
+        return os.path.join(self.dossier, nom)
+
+    def charges(self):
+        with self._verrou: return list(self._charges)
+
+    def obtenir(self, nom):
+        # Le verrou global ne couvre que le dictionnaire : ouverture (migration éventuelle) et
+        # fermeture d'une association évincée se font hors verrou, sans bloquer les autres
+        with self._verrou:
+            loc = self._charges.get(nom)
+            if loc is not None:
+                self._charges.move_to_end(nom)
+                return loc
+            chargement = self._chargements.setdefault(nom, threading.Lock())
+        with chargement:  # Une seule ouverture par association, même demandée par plusieurs sessions
+            with self._verrou:
+                loc = self._charges.get(nom)
+                if loc is not None:
+                    self._charges.move_to_end(nom)
+                    return loc
+            loc = Locataire(self.chemin(nom))
+            with self._verrou:
+                self._charges[nom] = loc
+                self._chargements.pop(nom, None)
+                evinces = [self._charges.popitem(last=False)[1] for _ in range(len(self._charges) - self.capacite)]
+                self.evictions += len(evinces)
+        for ancien in evinces: ancien.fermer()
+        return loc
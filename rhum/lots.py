@@ -0,0 +1,127 @@
+"""Opérations groupées sur les commandes, adhésions et dégustations.
+
+Chaque opération modifie l'état partagé et le grand livre (par deltas) en
+une passe et renvoie un `Lot` : les entités à écrire en une seule
+transaction (`DepotRhum.ecrire_entites`) et l'instantané des valeurs
+remplacées. `annuler` remet cet instantané en place, sauf pour les
+entités modifiées entre-temps par une autre session.
+"""
+COMMANDE_VIDE = {"qte": 0, "paye": False}
+PARTICIPANT_VIDE = {"inscrit": False, "repas": False, "paye": False}
+LIBELLES = {"adhesion": "Adhésions", "commande": "Commandes", "participant": "Dégustation"}
+
+
+class Lot:
+    def __init__(self, libelle):
+        self.libelle = libelle
+        self.entites = {}  # entité -> champs modifiés (None = tous), pour ecrire_entites
+        self.avant = {}  # entité -> valeur avant l'opération
+        self.apres = {}  # entité -> valeur écrite par l'opération
+
+    def __len__(self):
+        return len(self.entites)
+
+
+# --- LECTURE / ÉCRITURE D'UNE ENTITÉ ---
+def _lire(etat, e):
+    if e[0] == "adhesion": return bool(etat["adhesions"].get(e[1], False))
+    if e[0] == "commande": return {**COMMANDE_VIDE, **etat["mois_data"][e[1]]["adherents"].get(e[2], {})}
+    if e[0] == "participant": return {k: bool(v) for k, v in {**PARTICIPANT_VIDE, **etat["degustations"][e[1]]["participants"].get(e[2], {})}.items()}
+    if e[0] == "invites": return [dict(i) for i in etat["degustations"][e[1]]["invites"]]
+    raise ValueError(f"entité non groupable : {e[0]}")
+
+
+def _poser(etat, livre, lot, e, valeur):
+    """Donne `valeur` à l'entité `e` (état + grand livre) et l'ajoute au lot si elle change."""
+    ancien = _lire(etat, e)
+    if valeur == ancien: return
+    if e[0] == "adhesion":
+        livre.adhesion(ancien, valeur)
+        etat["adhesions"][e[1]] = valeur
+        champs = None
+    elif e[0] == "commande":
+        livre.commande(e[1], ancien, valeur)
+        etat["mois_data"][e[1]]["adherents"][e[2]] = valeur
+        champs = {k for k in valeur if valeur[k] != ancien[k]}
+    elif e[0] == "participant":
+        livre.participant(e[1], ancien, valeur)
+        etat["degustations"][e[1]]["participants"][e[2]] = valeur
+        champs = {k for k in valeur if valeur[k] != ancien[k]}
+    else:
+        livre.invites(e[1], ancien, valeur)
+        etat["degustations"][e[1]]["invites"] = valeur
+        # Écrits invité par invité (identifiant stable) : ajoutés, retirés ou modifiés
+        avant, apres = ({i["id"]: i for i in liste} for liste in (ancien, valeur))
+        for id_ in avant.keys() | apres.keys():
+            if avant.get(id_) != apres.get(id_): lot.entites[("invite", e[1], id_)] = None
+        lot.avant.setdefault(e, ancien)
+        lot.apres[e] = valeur
+        return
+    lot.avant.setdefault(e, ancien)
+    lot.apres[e] = valeur
+    anciens = lot.entites.get(e, set())
+    lot.entites[e] = None if champs is None or anciens is None else anciens | champs
+
+
+# --- OPÉRATIONS ---
+def copier_commandes(etat, livre, source, cible, noms=None, ecraser=False):
+    """Commandes de `source` reprises en `cible` (non payées).
+
+    Sans `ecraser`, seuls les adhérents sans commande en `cible` sont
+    complétés ; avec, `cible` devient une copie des quantités de `source`
+    (le payé est gardé quand la quantité ne change pas).
+    """
+    lot = Lot(f"Commandes {source} → {cible}")
+    src, dst = etat["mois_data"][source]["adherents"], etat["mois_data"][cible]["adherents"]
+    for n in etat["adherents_noms"] if noms is None else noms:
+        qte = src.get(n, COMMANDE_VIDE)["qte"]
+        actuel = dst.get(n, COMMANDE_VIDE)
+        if ecraser and qte != actuel["qte"]: _poser(etat, livre, lot, ("commande", cible, n), {"qte": qte, "paye": False})
+        elif not ecraser and qte and not actuel["qte"]: _poser(etat, livre, lot, ("commande", cible, n), {"qte": qte, "paye": False})
+    return lot
+
+
+def fixer(etat, livre, cible, noms, gratuits=frozenset(), **valeurs):
+    """Donne `valeurs` (paye=True, qte=1, inscrit=True...) à chaque adhérent de `noms`.
+
+    `cible` : ("adhesion",), ("commande", mois) ou ("participant", mois).
+    Les adhérents gratuits n'ont pas d'adhésion à régler ; payé et repas ne
+    sont fixés que sur une commande ou une inscription existante.
+    """
+    lot = Lot(f"{' '.join((LIBELLES[cible[0]], *cible[1:]))} : " + ", ".join(f"{k} = {'oui' if v is True else 'non' if v is False else v}" for k, v in valeurs.items()))
+    for n in noms:
+        e = (*cible, n)
+        if cible[0] == "adhesion":
+            if n not in gratuits: _poser(etat, livre, lot, e, bool(valeurs["paye"]))
+        else:
+            actuel = _lire(etat, e)
+            existe = actuel["qte"] if cible[0] == "commande" else actuel["inscrit"]
+            if existe or {"qte", "inscrit"} & set(valeurs): _poser(etat, livre, lot, e, {**actuel, **valeurs})
+    return lot
+
+
+def vider_degustation(etat, livre, mois):
+    """Désinscrit tous les adhérents et retire les invités de la dégustation `mois`."""
+    lot = Lot(f"Dégustation {mois} vidée")
+    for n in list(etat["degustations"][mois]["participants"]):
+        _poser(etat, livre, lot, ("participant", mois, n), dict(PARTICIPANT_VIDE))
+    _poser(etat, livre, lot, ("invites", mois), [])
+    return lot
+
+
+def reporter_degustation(etat, livre, source, cible):
+    """Inscrit en `cible` les inscrits de `source` (repas repris, non payé), sans toucher aux inscrits de `cible`."""
+    lot = Lot(f"Inscrits {source} → {cible}")
+    dst = etat["degustations"][cible]["participants"]
+    for n, p in etat["degustations"][source]["participants"].items():
+        if p.get("inscrit") and not dst.get(n, {}).get("inscrit"):
+            _poser(etat, livre, lot, ("participant", cible, n), {"inscrit": True, "repas": bool(p.get("repas")), "paye": False})
+    return lot
+
+
+def annuler(etat, livre, lot):
+    """Lot inverse de `lot` ; les entités modifiées depuis par ailleurs sont laissées telles quelles."""
+    inverse = Lot(f"Annulation : {lot.libelle}")
+    for e, valeur in lot.avant.items():
+        if _lire(etat, e) == lot.apres[e]: _poser(etat, livre, inverse, e, valeur)
+    return inverse
@@ -0,0 +1,52 @@
+"""Constantes et structures de l'état de l'association."""
+import time
+import unicodedata
+
+MOIS_SAMPLES = ["Février", "Mars", "Avril", "Mai", "Juin", "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
+MOIS_DEGUSTATIONS = ["Mars", "Juin", "Septembre", "Décembre"]
+
+
+def mois_vide():
+    return {"nom_bouteille": "", "prix_achat": 0.0, "prix_sample": 0.0, "adherents": {}}
+
+
+def degustation_vide():
+    return {"participants": {}, "invites": [], "prix_bouteilles": 0.0}
+
+
+def invite_vide(nom):
+    # Identifiant stable (horodatage ns, croissant) : chaque invité s'écrit seul, champ par champ
+    return {"id": time.time_ns(), "nom": nom, "repas": False, "paye": False}
+
+
+def etat_vide():
+    return {
+        "adherents_noms": [],
+        "mois_data": {m: mois_vide() for m in MOIS_SAMPLES},
+        "adhesions": {},
+        "degustations": {m: degustation_vide() for m in MOIS_DEGUSTATIONS},
+        "solde_depart": 0.0,
+        "rhumotheque": {},
+    }
+
+CAPACITE_BOUTEILLE = 20  # Capacité théorique (20 samples de 3cl + marge)
+RHUMOTHEQUE_PRELEVEMENT = 2  # Nombre de samples prélevés pour la rhumothèque (2x3cl)
+COTISATION = 35  # Adhésion annuelle (€)
+PRIX_DEGUSTATION = 35  # Participation à une dégustation, adhérent ou invité (€)
+PRIX_REPAS = 15  # Coût du repas par convive pour l'association (€)
+GRATUITS_VIE = ["BORDES", "JAUBERT"]  # Adhésion gratuite à vie (nom de famille)
+
+
+def retirer_accents(texte):
+    if not isinstance(texte, str): return texte
+    try: return "".join([c for c in unicodedata.normalize('NFKD', texte) if not unicodedata.combining(c)])
+    except: return texte
+
+
+def cle_nom(nom):
+    """Forme normalisée d'un nom pour les comparaisons (sans accents, majuscules, espaces uniques)."""
+    return " ".join(retirer_accents(nom).upper().split())
+
+
+def est_gratuit(nom):
+    return nom.split()[0].upper() in GRATUITS_VIE if nom.split() else False
@@ -0,0 +1,71 @@
+"""Cache d'état unique par processus, partagé par toutes les sessions."""
+import threading
+
+from .persistance import Planificateur
+from .tresorerie import GrandLivre
+
+
+class EtatPartage:
+    """Garde en mémoire le dernier état chargé du dépôt.
+
+    Les sessions lisent toutes le même objet (pas de copie). Il n'est rechargé
+    que si le numéro de version du dépôt a bougé à cause d'une écriture
+    extérieure (autre processus) ou d'un appel à `invalider()`. Une
+    session dont le rerun a commencé avant un rechargement modifie encore
+    l'ancien objet : ses modifications sont écrites puis l'état est relu
+    (voir Planificateur).
+    """
+
+    def __init__(self, depot):
+        self.depot = depot
+        self.etat = None
+        self.livre = None  # GrandLivre tenu à jour par deltas depuis l'interface
+        self.gratuits = frozenset()  # adhérents gratuits à vie (drapeau du registre)
+        self.version = None
+        self.generation = 0  # incrémentée à chaque rechargement complet
+        self.versions = {}  # version par table éditable, incrémentée à chaque modification
+        self._tables = {}  # Données dérivées (DataFrames des data_editor...) : cle -> (version, valeur)
+        self._verrou = threading.Lock()
+        depot.ecoutes.append(self._apres_ecriture)
+        self.ecritures = Planificateur(depot, lambda: self.etat, lambda: self.version, perime=self.invalider)
+
+    def lire(self):
+        v = self.depot.version()
+        if v != self.version:
+            # Les modifications encore en attente doivent partir avant de relire la base
+            if self.ecritures.en_attente():
+                self.ecritures.vider()
+                v = self.depot.version()
+            with self._verrou:
+                if v != self.version:
+                    self.etat = self.depot.charger()
+                    self.gratuits = self.depot.gratuits()
+                    self.livre = GrandLivre(self.etat)
+                    self.version = v
+                    self.generation += 1
+                    self._tables.clear()
+        return self.etat
+
+    def modifie(self, *cles):
+        """Signale que les données des tables `cles` ont changé."""
+        with self._verrou:
+            for c in cles: self.versions[c] = self.versions.get(c, 0) + 1
+
+    def table(self, cle, construire):
+        """Donnée dérivée `cle` (DataFrame d'entrée d'un data_editor, indicateurs...), reconstruite seulement si elle a changé."""
+        v = (self.generation, self.versions.get(cle, 0))
+        cache = self._tables.get(cle)
+        if cache is None or cache[0] != v:
+            cache = self._tables[cle] = (v, construire())
+        return cache[1]
+
+    def invalider(self):
+        """À appeler après une écriture qui remplace des structures au lieu de les modifier."""
+        with self._verrou:
+            self.version = None
+
+    def _apres_ecriture(self, version):
+        # Écriture faite depuis ce processus sur l'objet partagé : il est déjà à jour
+        with self._verrou:
+            if self.version is not None and version == self.version + 1:
+                self.version = version
@@ -0,0 +1,117 @@
+"""Écriture différée (write-behind) des modifications de l'interface.
+
+L'interface marque des entités comme modifiées ; un thread d'arrière-plan
+les écrit en une seule transaction au plus `delai` secondes après la
+première modification. Les rafales de modifications sont ainsi regroupées
+et les E/S disque sortent du rendu. `vider()` force une écriture immédiate
+(déconnexion, export, rechargement).
+
+Chaque entité porte l'ensemble des champs modifiés et leur valeur relevée
+au marquage : seuls ces champs sont écrits, avec ces valeurs. Si un autre
+processus a écrit entre-temps, les champs des deux côtés sont conservés
+(sur un même champ, la dernière écriture l'emporte) et l'état partagé se
+recharge. Une modification faite sur un état remplacé depuis (rechargement
+pendant le rerun) est écrite telle quelle, puis l'état est relu.
+"""
+import atexit
+import threading
+import time
+
+from .stockage import valeur_entite
+
+
+class Planificateur:
+    def __init__(self, depot, lire_etat, lire_version=lambda: None, delai=1.0, perime=lambda: None):
+        self.depot = depot
+        self.lire_etat = lire_etat  # renvoie l'état courant
+        self.lire_version = lire_version  # version de la base sur laquelle repose cet état
+        self.perime = perime  # appelée quand l'état courant ne contient pas des modifications écrites
+        self.delai = delai
+        self.derniere_erreur = None
+        self.fusions = 0  # écritures faites alors qu'un autre processus avait écrit
+        self._arrete = False
+        self._sales = {}  # entité -> (instant du premier marquage, champs modifiés ou None = tous, valeur relevée)
+        self._bases = []  # états sur lesquels portent les modifications en attente
+        self._cond = threading.Condition()
+        self._ecriture = threading.Lock()
+        self._thread = threading.Thread(target=self._boucle, name="rhum-persistance", daemon=True)
+        self._thread.start()
+        atexit.register(self.vider)
+
+    def marquer(self, *entite, champs=None, etat=None):
+        """entite : ("commande", mois, nom), ("invite", mois, id), ("rhum", id)... voir DepotRhum.ecrire_valeurs.
+
+        champs : noms des champs modifiés (ex. {"paye"}) ; None = toute l'entité.
+        etat : état modifié par l'appelant (par défaut l'état courant) ; la
+        valeur de l'entité y est relevée tout de suite.
+        """
+        etat = self.lire_etat() if etat is None else etat
+        valeur = valeur_entite(etat, entite)
+        with self._cond:
+            self._ajouter(entite, time.monotonic(), champs, valeur)
+            if not any(b is etat for b in self._bases): self._bases.append(etat)
+            self._cond.notify()
+        # Plus de thread (association évincée pendant un rerun) : écriture immédiate
+        if self._arrete: self.vider()
+
+    def ecrire(self, etat, entites):
+        """Écrit tout de suite `entites` ({entité: champs}) modifiées dans `etat` (opérations groupées)."""
+        for e, champs in entites.items(): self.marquer(*e, champs=champs, etat=etat)
+        self.vider()
+        if self.derniere_erreur is not None: raise self.derniere_erreur
+
+    def _ajouter(self, entite, instant, champs, valeur):
+        if entite in self._sales:
+            t, deja, avant = self._sales[entite]
+            # Champs marqués plus tôt : valeur relevée à ce moment-là
+            if champs is not None and isinstance(valeur, dict) and isinstance(avant, dict):
+                valeur = {**avant, **{k: valeur[k] for k in champs}}
+            self._sales[entite] = (t, None if deja is None or champs is None else deja | set(champs), valeur)
+        else:
+            self._sales[entite] = (instant, None if champs is None else set(champs), valeur)
+
+    def arreter(self):
+        """Dernière écriture puis arrêt du thread ; les marquages suivants sont écrits immédiatement."""
+        with self._cond:
+            self._arrete = True
+            self._cond.notify()
+        atexit.unregister(self.vider)  # sinon l'objet (et l'état) resterait référencé jusqu'à la fin du processus
+        self.vider()
+
+    def en_attente(self):
+        with self._cond: return len(self._sales)
+
+    def vider(self):
+        """Écrit tout de suite les entités en attente."""
+        with self._ecriture:
+            with self._cond:
+                lot, self._sales = self._sales, {}
+                bases, self._bases = self._bases, []
+            if not lot: return
+            try:
+                if self.depot.ecrire_valeurs({e: (ch, v) for e, (_, ch, v) in lot.items()}, self.lire_version()):
+                    self.fusions += 1
+                self.derniere_erreur = None
+            except Exception as e:
+                self.derniere_erreur = e
+                with self._cond:
+                    # Remis en file pour la prochaine tentative, avec les champs marqués depuis
+                    recents, self._sales = self._sales, lot
+                    for entite, (t, ch, v) in recents.items(): self._ajouter(entite, t, ch, v)
+                    self._bases = bases + [b for b in self._bases if not any(b is d for d in bases)]
+                return
+            # Modifications faites sur un état remplacé depuis : l'état courant ne les contient pas
+            courant = self.lire_etat()
+            if any(b is not courant for b in bases): self.perime()
+
+    def _boucle(self):
+        while True:
+            with self._cond:
+                while not self._sales and not self._arrete: self._cond.wait()
+                if self._arrete: return
+                attente = min(t for t, _, _ in self._sales.values()) + self.delai - time.monotonic()
+                if attente > 0:
+                    self._cond.wait(attente)
+                    continue
+            self.vider()
+            if self.derniere_erreur is not None: time.sleep(self.delai)
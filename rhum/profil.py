@@ -0,0 +1,109 @@
+"""Chronométrage optionnel des reruns (activé par la variable d'environnement RHUM_PROFIL).
+
+Chaque section chronométrée alimente une fenêtre glissante de durées par
+nom de section (percentiles affichés dans la barre latérale). Avec
+RHUM_PROFIL_TRACE=fichier.jsonl, chaque rerun complet (ou rerun de
+fragment) est aussi ajouté en une ligne JSON au fichier de trace. Le
+panneau n'est montré qu'à l'administrateur (RHUM_PROFIL_ADMIN : empreinte
+SHA-256 de son mot de passe, saisi dans la session).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+FENETRE = 500  # durées gardées par section
+
+
+class Profileur:
+    def __init__(self, actif=False, trace=None, fenetre=FENETRE, **infos):
+        self.actif = actif
+        self.trace = trace
+        self.infos = infos  # ajoutées à chaque ligne de trace (association...)
+        self.fenetre = fenetre
+        self.durees = {}  # section -> deque des dernières durées (s)
+        self.compteurs = Counter()
+        self._verrou = threading.Lock()
+        self._local = threading.local()  # rerun en cours : un rerun s'exécute entièrement dans son propre thread
+
+    @classmethod
+    def depuis_environnement(cls, **infos):
+        trace = os.environ.get("RHUM_PROFIL_TRACE") or None
+        return cls(actif=bool(os.environ.get("RHUM_PROFIL") or trace), trace=trace, **infos)
+
+    # --- MESURES ---
+    def debut(self):
+        """Début d'un rerun complet du script."""
+        if self.actif: self._local.rerun = {"debut": time.perf_counter(), "sections": {}}
+
+    def fin(self, **infos):
+        """Fin d'un rerun complet : durée totale et ligne de trace."""
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is None: return
+        self._local.rerun = None
+        total = time.perf_counter() - rerun["debut"]
+        self._ajouter("rerun complet", total)
+        self._tracer({"total": round(total, 6), "sections": rerun["sections"], **infos})
+
+    @contextmanager
+    def section(self, nom):
+        if not self.actif:
+            yield
+            return
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - t
+            self._ajouter(nom, duree)
+            rerun = getattr(self._local, "rerun", None)
+            if rerun is not None:
+                rerun["sections"][nom] = round(rerun["sections"].get(nom, 0) + duree, 6)
+            else:
+                # Rerun de fragment : le script complet ne tourne pas, la section est tracée seule
+                self._tracer({"total": round(duree, 6), "sections": {nom: round(duree, 6)}, "fragment": True})
+
+    def chrono(self, nom):
+        """Décorateur : section `nom`, suffixée du premier argument (mois, id...) s'il y en a un."""
+        def decorateur(f):
+            @functools.wraps(f)
+            def enveloppe(*args, **kwargs):
+                with self.section(f"{nom} › {args[0]}" if args else nom):
+                    return f(*args, **kwargs)
+            return enveloppe
+        return decorateur
+
+    def compter(self, nom, n=1):
+        if self.actif:
+            with self._verrou: self.compteurs[nom] += n
+
+    def _ajouter(self, nom, duree):
+        with self._verrou:
+            self.durees.setdefault(nom, deque(maxlen=self.fenetre)).append(duree)
+
+    def _tracer(self, ligne):
+        if not self.trace: return
+        texte = json.dumps({"date": round(time.time(), 3), **self.infos, **ligne}, ensure_ascii=False) + "\n"
+        with self._verrou:
+            with open(self.trace, "a", encoding="utf-8") as f: f.write(texte)
+
+    # --- RÉSULTATS ---
+    def percentiles(self):
+        """[{section, n, p50, p90, p99, max}] en millisecondes, sections les plus lentes (p90) d'abord."""
+        with self._verrou:
+            series = {nom: np.fromiter(d, float) for nom, d in self.durees.items()}
+        lignes = []
+        for nom, d in series.items():
+            p50, p90, p99 = np.percentile(d, [50, 90, 99]) * 1000
+            lignes.append({"Section": nom, "n": len(d), "p50 ms": p50, "p90 ms": p90, "p99 ms": p99, "max ms": d.max() * 1000})
+        return sorted(lignes, key=lambda l: -l["p90 ms"])
+
+    def reinitialiser(self):
+        with self._verrou:
+            self.durees.clear()
+            self.compteurs.clear()
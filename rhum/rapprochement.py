@@ -0,0 +1,189 @@
+"""Rapprochement d'un relevé bancaire (CSV) avec les sommes dues par les adhérents.
+
+Chaque virement reçu est attribué à un adhérent via un index inversé des
+mots de noms normalisés (sans accents, majuscules), avec repli approché
+(difflib) sur les mots inconnus. Son montant est ensuite comparé aux
+sommes encore dues par cet adhérent (adhésion, samples qte × prix,
+dégustations) : une combinaison exacte de postes est proposée. `appliquer`
+coche les postes retenus sur l'état et le grand livre, et renvoie les
+entités à écrire en une seule transaction.
+"""
+import difflib
+import heapq
+import re
+
+from .import_csv import lire_csv
+from .metier import COTISATION, PRIX_DEGUSTATION, cle_nom
+
+COLONNES = {
+    "date": ("DATE",),
+    "libelle": ("LIBELLE", "INTITULE", "DESCRIPTION", "LABEL", "MOTIF", "DETAIL"),
+    "credit": ("CREDIT",),
+    "montant": ("MONTANT", "AMOUNT"),
+}
+MOTS_IGNORES = {"VIR", "VIREMENT", "SEPA", "RECU", "DE", "DU", "M", "MR", "MME", "MLLE", "ET", "POUR", "REF", "INST"}
+SEUIL_APPROCHE = 0.85
+CANDIDATS_MAX = 10  # adhérents essayés par virement
+CENTIMES = 100
+
+
+def _mots(texte):
+    return [m for m in re.split(r"[^A-Z0-9]+", cle_nom(texte)) if m and m not in MOTS_IGNORES]
+
+
+def lire_montant(texte):
+    """'1 234,50 €', '+35.00', '35,00' -> float ; None si vide."""
+    t = re.sub(r"[^\d,.\-]", "", texte or "")
+    if not t: return None
+    if "," in t and "." in t:
+        t = t.replace(".", "") if t.rfind(",") > t.rfind(".") else t.replace(",", "")
+    return float(t.replace(",", "."))
+
+
+# --- LECTURE DU RELEVÉ ---
+def _colonnes(entete):
+    idx = {}
+    for i, c in enumerate(entete):
+        c = cle_nom(c)
+        for champ, prefixes in COLONNES.items():
+            if champ not in idx and c.startswith(prefixes): idx[champ] = i
+    if "libelle" not in idx or not ({"credit", "montant"} & set(idx)):
+        raise ValueError("colonnes Libellé et Montant (ou Crédit) introuvables dans l'en-tête")
+    return idx
+
+
+def lire_releve(fichier):
+    """Virements reçus du CSV binaire `fichier` : [{"ligne", "date", "libelle", "montant"}] (montants > 0)."""
+    def lire(reader, encodage, separateur):
+        idx = _colonnes(next(reader, []))
+        col_montant = idx.get("credit", idx.get("montant"))
+        lignes = []
+        for r in reader:
+            if len(r) <= max(idx.values()): continue
+            try: m = lire_montant(r[col_montant])
+            except ValueError: continue
+            if m and m > 0:
+                lignes.append({"ligne": reader.line_num, "date": r[idx["date"]] if "date" in idx else "",
+                               "libelle": r[idx["libelle"]].strip(), "montant": m})
+        return lignes
+    return lire_csv(fichier, lire)
+
+
+# --- SOMMES DUES ---
+def postes_dus(etat, gratuits):
+    """{nom: [(entité, libellé, centimes)]} des sommes non réglées."""
+    dus = {}
+    for n in etat["adherents_noms"]:
+        if n not in gratuits and not etat["adhesions"].get(n, False):
+            dus.setdefault(n, []).append((("adhesion", n), "Adhésion", COTISATION * CENTIMES))
+    for m, d in etat["mois_data"].items():
+        for n, v in d["adherents"].items():
+            if v["qte"] and not v["paye"] and d["prix_sample"]:
+                dus.setdefault(n, []).append((("commande", m, n), f"Samples {m}", round(v["qte"] * d["prix_sample"] * CENTIMES)))
+    for m, dg in etat["degustations"].items():
+        for n, p in dg["participants"].items():
+            if p.get("inscrit") and not p.get("paye"):
+                dus.setdefault(n, []).append((("participant", m, n), f"Dégustation {m}", PRIX_DEGUSTATION * CENTIMES))
+    return dus
+
+
+def combinaison(postes, centimes):
+    """Postes dont la somme vaut exactement `centimes` (le moins de postes possible), ou None."""
+    atteints = {0: ()}
+    for i, (_, _, montant) in enumerate(postes):
+        for somme, choix in list(atteints.items()):
+            s = somme + montant
+            if s <= centimes and (s not in atteints or len(atteints[s]) > len(choix) + 1):
+                atteints[s] = choix + (i,)
+    choix = atteints.get(centimes)
+    return [postes[i] for i in choix] if choix else None
+
+
+# --- ATTRIBUTION ---
+class IndexNoms:
+    """Mots des noms normalisés -> adhérents, avec repli approché mis en cache."""
+
+    def __init__(self, noms):
+        self.mots = {n: set(_mots(n)) for n in noms}
+        self.index = {}
+        for n, mots in self.mots.items():
+            for m in mots: self.index.setdefault(m, set()).add(n)
+        self.poids = {m: 1 / len(porteurs) for m, porteurs in self.index.items()}
+        self.vocabulaire = sorted(self.index)
+        self._approches = {}
+
+    def _approche(self, mot):
+        if mot not in self._approches:
+            voisins = [v for v in self.vocabulaire if v[0] == mot[0] and abs(len(v) - len(mot)) <= 2]
+            self._approches[mot] = difflib.get_close_matches(mot, voisins, n=1, cutoff=SEUIL_APPROCHE)
+        return self._approches[mot]
+
+    def candidats(self, libelle):
+        """[(nom, correspondance)] : tous les mots du nom présents ("exact"), dont certains proches ("approché"), ou une partie ("partiel").
+
+        Chaque mot inconnu du libellé est remplacé par le mot du registre le
+        plus proche. Les mots rares (nom de famille) pèsent plus que les mots
+        fréquents (prénoms) ; un adhérent trouvé par les seuls mots portés par
+        plusieurs adhérents n'est pas proposé. Seuls les CANDIDATS_MAX
+        meilleurs adhérents sont gardés.
+        """
+        mots = set(_mots(libelle))
+        exacts = {m for m in mots if m in self.index}
+        mots = exacts | {v for m in mots - exacts if len(m) >= 3 for v in self._approche(m)}
+        connus = sorted(mots, key=lambda m: len(self.index[m]))
+        # Candidats : porteurs des mots les plus rares, jusqu'à en avoir assez
+        candidats = set()
+        for m in connus:
+            candidats |= self.index[m]
+            if len(candidats) >= CANDIDATS_MAX or any(self.mots[n] <= mots for n in self.index[m]): break
+        candidats = {n for n in candidats if any(len(self.index[m]) == 1 for m in self.mots[n] & mots)}
+        meilleurs = heapq.nlargest(CANDIDATS_MAX, candidats, key=lambda n: (len(self.mots[n] & mots), sum(self.poids[m] for m in self.mots[n] & mots)))
+        return [(n, "exact" if self.mots[n] <= exacts else "approché" if self.mots[n] <= mots else "partiel") for n in meilleurs]
+
+
+def rapprocher(lignes, etat, gratuits=frozenset()):
+    """Une proposition par ligne du relevé ; un poste dû n'est attribué qu'une fois.
+
+    Les lignes au nom complet sont attribuées d'abord, pour qu'une ligne
+    ambiguë ne prenne pas le poste d'un adhérent clairement identifié.
+    """
+    index = IndexNoms(etat["adherents_noms"])
+    dus = postes_dus(etat, gratuits)
+    pris = set()
+    candidats = [index.candidats(l["libelle"]) for l in lignes]
+    propositions = [dict(l, nom=None, correspondance="aucune", postes=[]) for l in lignes]
+    for i in sorted(range(len(lignes)), key=lambda i: not candidats[i] or candidats[i][0][1] != "exact"):
+        p = propositions[i]
+        centimes = round(p["montant"] * CENTIMES)
+        for nom, corresp in candidats[i]:
+            libres = [d for d in dus.get(nom, ()) if d[0] not in pris]
+            choix = combinaison(libres, centimes)
+            if choix:
+                p.update(nom=nom, correspondance=corresp, postes=choix)
+                pris.update(d[0] for d in choix)
+                break
+            if p["nom"] is None: p.update(nom=nom, correspondance=f"{corresp}, montant sans correspondance")
+    return propositions
+
+
+def appliquer(etat, livre, postes):
+    """Coche les `postes` (entités) comme réglés dans `etat` et `livre` ; renvoie {entité: champs} à écrire.
+
+    Un poste réglé entre-temps (autre session) est ignoré.
+    """
+    entites = {}
+    for e in postes:
+        if e[0] == "adhesion":
+            if etat["adhesions"].get(e[1], False): continue
+            livre.adhesion(False, True)
+            etat["adhesions"][e[1]] = True
+            entites[e] = None
+        else:
+            lignes = etat["mois_data"][e[1]]["adherents"] if e[0] == "commande" else etat["degustations"][e[1]]["participants"]
+            ancien = lignes.get(e[2])
+            if not ancien or ancien.get("paye"): continue
+            nouveau = lignes[e[2]] = dict(ancien, paye=True)
+            if e[0] == "commande": livre.commande(e[1], ancien, nouveau)
+            else: livre.participant(e[1], ancien, nouveau)
+            entites[e] = {"paye"}
+    return entites
@@ -0,0 +1,51 @@
+"""Index de recherche de la rhumothèque (noms et notes sans accents)."""
+import bisect
+
+from .metier import MOIS_SAMPLES, cle_nom
+
+
+def mois_bouteille(id_rhum, rd):
+    """Mois d'origine : clé des entrées automatiques, `mois_ref` des ajouts manuels."""
+    return rd.get("mois_ref") or (id_rhum if id_rhum in MOIS_SAMPLES else "Autre")
+
+
+class IndexRhum:
+    def __init__(self, rhumotheque):
+        self.ordre = []  # ids dans l'ordre d'ajout
+        self.fiches = {}  # id -> (en_stock, valeur, mois)
+        postings = {}
+        for id_rhum, rd in rhumotheque.items():
+            if not rd.get("nom"): continue
+            self.ordre.append(id_rhum)
+            self.fiches[id_rhum] = (bool(rd.get("en_stock", True)), float(rd.get("valeur", 0.0) or 0.0), mois_bouteille(id_rhum, rd))
+            for mot in cle_nom(f"{rd['nom']} {rd.get('notes', '')}").split():
+                postings.setdefault(mot, set()).add(id_rhum)
+        self._mots = sorted(postings)
+        self._postings = postings
+
+    def _prefixe(self, debut):
+        # Tous les ids dont un mot commence par `debut` (vocabulaire trié : recherche dichotomique)
+        ids = set()
+        i = bisect.bisect_left(self._mots, debut)
+        while i < len(self._mots) and self._mots[i].startswith(debut):
+            ids |= self._postings[self._mots[i]]
+            i += 1
+        return ids
+
+    def rechercher(self, texte="", en_stock=None, mois=None, valeur_min=None, valeur_max=None):
+        """Ids correspondant à tous les mots de `texte` (préfixes) et aux filtres, dans l'ordre d'ajout."""
+        candidats = None
+        for mot in cle_nom(texte or "").split():
+            ids = self._prefixe(mot)
+            candidats = ids if candidats is None else candidats & ids
+            if not candidats: return []
+        res = []
+        for id_rhum in self.ordre:
+            if candidats is not None and id_rhum not in candidats: continue
+            stock, valeur, m = self.fiches[id_rhum]
+            if en_stock is not None and stock != en_stock: continue
+            if mois is not None and m != mois: continue
+            if valeur_min is not None and valeur < valeur_min: continue
+            if valeur_max is not None and valeur > valeur_max: continue
+            res.append(id_rhum)
+        return res
@@ -0,0 +1,462 @@
+"""Dépôt SQLite (mode WAL) de l'état de l'association.
+
+Chaque modification de l'interface écrit uniquement les lignes concernées
+(upsert par enregistrement) au lieu de réécrire tout l'état. Quand seuls
+certains champs d'une ligne ont changé, seuls ces champs sont écrits : deux
+sessions qui modifient des champs différents d'une même ligne ne s'écrasent
+pas.
+
+Les adhérents sont enregistrés une fois dans un registre (identifiant entier
+stable, nom, drapeau « gratuit à vie » précalculé) ; commandes, adhésions et
+participations y font référence par identifiant. Renommer un adhérent ne
+touche qu'une ligne.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from .metier import est_gratuit, etat_vide
+
+TAILLE_POOL = 4  # connexions gardées ouvertes par base
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT);
+INSERT OR IGNORE INTO meta VALUES ('version', '0');
+CREATE TABLE IF NOT EXISTS adherents (
+    id INTEGER PRIMARY KEY, nom TEXT NOT NULL UNIQUE,
+    gratuit INTEGER NOT NULL DEFAULT 0, actif INTEGER NOT NULL DEFAULT 1);
+CREATE TABLE IF NOT EXISTS mois (
+    mois TEXT PRIMARY KEY, nom_bouteille TEXT NOT NULL DEFAULT '',
+    prix_achat REAL NOT NULL DEFAULT 0, prix_sample REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS commandes (
+    mois TEXT NOT NULL, adherent INTEGER NOT NULL REFERENCES adherents (id),
+    qte INTEGER NOT NULL DEFAULT 0, paye INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mois, adherent));
+CREATE INDEX IF NOT EXISTS idx_commandes_adherent ON commandes (adherent);
+CREATE TABLE IF NOT EXISTS adhesions (adherent INTEGER PRIMARY KEY REFERENCES adherents (id), paye INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS degustations (mois TEXT PRIMARY KEY, prix_bouteilles REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS participants (
+    mois TEXT NOT NULL, adherent INTEGER NOT NULL REFERENCES adherents (id),
+    inscrit INTEGER NOT NULL DEFAULT 0, repas INTEGER NOT NULL DEFAULT 0, paye INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mois, adherent));
+CREATE INDEX IF NOT EXISTS idx_participants_adherent ON participants (adherent);
+CREATE TABLE IF NOT EXISTS invites (  -- rang : identifiant stable de l'invité, croissant avec l'ordre d'ajout
+    mois TEXT NOT NULL, rang INTEGER NOT NULL, nom TEXT NOT NULL DEFAULT '',
+    repas INTEGER NOT NULL DEFAULT 0, paye INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mois, rang));
+CREATE TABLE IF NOT EXISTS rhumotheque (
+    id TEXT PRIMARY KEY, nom TEXT NOT NULL DEFAULT '', mois_ref TEXT,
+    en_stock INTEGER NOT NULL DEFAULT 1, valeur REAL NOT NULL DEFAULT 0, notes TEXT NOT NULL DEFAULT '');
+"""
+
+# Ancien schéma (commandes, adhésions et participations indexées par nom) -> registre des adhérents
+MIGRATION_REGISTRE = """
+BEGIN IMMEDIATE;
+ALTER TABLE adherents RENAME TO v1_adherents;
+ALTER TABLE commandes RENAME TO v1_commandes;
+ALTER TABLE adhesions RENAME TO v1_adhesions;
+ALTER TABLE participants RENAME TO v1_participants;
+%s
+INSERT INTO adherents (nom, actif) SELECT nom, 1 FROM v1_adherents ORDER BY nom;
+INSERT OR IGNORE INTO adherents (nom, actif)
+    SELECT nom, 0 FROM (SELECT nom FROM v1_commandes UNION SELECT nom FROM v1_adhesions UNION SELECT nom FROM v1_participants);
+INSERT INTO commandes SELECT c.mois, a.id, c.qte, c.paye FROM v1_commandes c JOIN adherents a USING (nom) ORDER BY c.rowid;
+INSERT INTO adhesions SELECT a.id, h.paye FROM v1_adhesions h JOIN adherents a USING (nom) ORDER BY h.rowid;
+INSERT INTO participants SELECT p.mois, a.id, p.inscrit, p.repas, p.paye FROM v1_participants p JOIN adherents a USING (nom) ORDER BY p.rowid;
+DROP TABLE v1_adherents;
+DROP TABLE v1_commandes;
+DROP TABLE v1_adhesions;
+DROP TABLE v1_participants;
+UPDATE meta SET valeur = CAST(valeur AS INTEGER) + 1 WHERE cle = 'version';
+COMMIT;
+""" % SCHEMA
+
+
+def ecrire_atomique(chemin, contenu):
+    """Écrit `contenu` (bytes) dans un fichier temporaire puis le renomme : jamais de fichier tronqué."""
+    tmp = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(contenu)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, chemin)
+
+
+def _entier(v):
+    try: return int(v)
+    except (TypeError, ValueError): return 0
+
+
+def _reel(v):
+    try: return float(v)
+    except (TypeError, ValueError): return 0.0
+
+
+def _bool(v):
+    # Les cellules des data_editor arrivent en numpy.bool_ (ou NaN si vidées)
+    return 1 if v is True or (v is not None and v == v and bool(v)) else 0
+
+
+def _texte(v):
+    return "" if v is None else str(v)
+
+
+def _octets(valeurs):
+    # Taille encodée des valeurs liées à une requête (entiers et réels : 8 octets)
+    return sum(len(v.encode()) if isinstance(v, str) else len(v) if isinstance(v, bytes) else 0 if v is None else 8 for v in valeurs)
+
+
+def _meta(c, cle):
+    r = c.execute("SELECT valeur FROM meta WHERE cle = ?", (cle,)).fetchone()
+    return r[0] if r else None
+
+
+# --- LECTURE ---
+def lire_etat(c):
+    """État complet lu sur la connexion `c`, sans écriture ni migration (base ouverte en lecture seule possible)."""
+    etat = etat_vide()
+    # Un seul objet chaîne par adhérent, partagé par toutes les structures de l'état
+    noms = dict(c.execute("SELECT id, nom FROM adherents"))
+    etat["adherents_noms"] = [noms[i] for i, in c.execute("SELECT id FROM adherents WHERE actif ORDER BY nom")]
+    solde = _meta(c, "solde_depart")
+    etat["solde_depart"] = float(solde) if solde is not None else 0.0
+
+    for m, nb, pa, ps in c.execute("SELECT mois, nom_bouteille, prix_achat, prix_sample FROM mois ORDER BY rowid"):
+        etat["mois_data"][m] = {"nom_bouteille": nb, "prix_achat": pa, "prix_sample": ps, "adherents": {}}
+    for m, a, q, p in c.execute("SELECT mois, adherent, qte, paye FROM commandes ORDER BY rowid"):
+        if m in etat["mois_data"]: etat["mois_data"][m]["adherents"][noms[a]] = {"qte": q, "paye": bool(p)}
+
+    etat["adhesions"] = {noms[a]: bool(p) for a, p in c.execute("SELECT adherent, paye FROM adhesions ORDER BY rowid")}
+
+    for m, pb in c.execute("SELECT mois, prix_bouteilles FROM degustations ORDER BY rowid"):
+        etat["degustations"][m] = {"participants": {}, "invites": [], "prix_bouteilles": pb}
+    for m, a, i, r, p in c.execute("SELECT mois, adherent, inscrit, repas, paye FROM participants ORDER BY rowid"):
+        if m in etat["degustations"]:
+            etat["degustations"][m]["participants"][noms[a]] = {"inscrit": bool(i), "repas": bool(r), "paye": bool(p)}
+    for m, i, n, r, p in c.execute("SELECT mois, rang, nom, repas, paye FROM invites ORDER BY mois, rang"):
+        if m in etat["degustations"]:
+            etat["degustations"][m]["invites"].append({"id": i, "nom": n, "repas": bool(r), "paye": bool(p)})
+
+    for id_rhum, nom, ref, stock, val, notes in c.execute(
+            "SELECT id, nom, mois_ref, en_stock, valeur, notes FROM rhumotheque ORDER BY rowid"):
+        rd = {"nom": nom, "en_stock": bool(stock), "valeur": val, "notes": notes}
+        if ref is not None: rd["mois_ref"] = ref
+        etat["rhumotheque"][id_rhum] = rd
+    return etat
+
+
+class _Compteur:
+    """Connexion d'une transaction : compte les octets des valeurs écrites (INSERT, UPDATE, DELETE)."""
+
+    def __init__(self, c):
+        self._c = c
+        self.octets = 0
+
+    def execute(self, sql, params=()):
+        if not sql.lstrip().upper().startswith("SELECT"): self.octets += _octets(params)
+        return self._c.execute(sql, params)
+
+    def executemany(self, sql, lignes):
+        lignes = list(lignes)
+        self.octets += sum(_octets(p) for p in lignes)
+        return self._c.executemany(sql, lignes)
+
+    def __getattr__(self, nom):
+        return getattr(self._c, nom)
+
+
+# Entités écrivables champ par champ : type -> (table, colonnes clés, {champ: conversion})
+CHAMPS = {
+    "mois": ("mois", ("mois",), {"nom_bouteille": _texte, "prix_achat": _reel, "prix_sample": _reel}),
+    "commande": ("commandes", ("mois", "adherent"), {"qte": _entier, "paye": _bool}),
+    "participant": ("participants", ("mois", "adherent"), {"inscrit": _bool, "repas": _bool, "paye": _bool}),
+    "invite": ("invites", ("mois", "rang"), {"nom": _texte, "repas": _bool, "paye": _bool}),
+    "rhum": ("rhumotheque", ("id",), {"nom": _texte, "mois_ref": lambda v: v, "en_stock": _bool, "valeur": _reel, "notes": _texte}),
+}
+
+
+def valeur_entite(etat, entite):
+    """Copie de la valeur de `entite` dans `etat`, à écrire par DepotRhum.ecrire_valeurs (None : invité ou bouteille retiré)."""
+    type_, *cle = entite
+    if type_ == "solde": return etat["solde_depart"]
+    if type_ == "adhesion": return bool(etat["adhesions"].get(cle[0], False))
+    if type_ == "degustation": return etat["degustations"][cle[0]].get("prix_bouteilles", 0.0)
+    if type_ == "mois": source = etat["mois_data"][cle[0]]
+    elif type_ == "commande": source = etat["mois_data"][cle[0]]["adherents"].get(cle[1], {"qte": 0, "paye": False})
+    elif type_ == "participant": source = etat["degustations"][cle[0]]["participants"].get(cle[1], {})
+    elif type_ == "invite": source = next((i for i in etat["degustations"][cle[0]]["invites"] if i.get("id") == cle[1]), None)
+    elif type_ == "rhum": source = etat["rhumotheque"].get(cle[0])
+    else: raise ValueError(f"Entité inconnue : {type_}")
+    return None if source is None else {ch: source.get(ch) for ch in CHAMPS[type_][2]}
+
+
+class DepotRhum:
+    """Accès à la base par un petit pool de connexions.
+
+    Streamlit exécute chaque rerun dans un nouveau thread : une connexion par
+    thread serait rouverte (PRAGMA compris) à chaque rerun. Les connexions
+    sont donc empruntées au pool le temps d'une lecture ou d'une transaction.
+    """
+
+    def __init__(self, chemin, fichier_json=None):
+        self.chemin = chemin
+        self._pool = queue.LifoQueue()  # connexions libres, la plus récente d'abord
+        self.ecoutes = []  # fonctions appelées avec le nouveau numéro de version après chaque écriture
+        self.stats = Counter()  # transactions, lignes et octets écrits, secondes passées à écrire (tous threads)
+        with self._connexion() as c:
+            migrer = "nom" in [col[1] for col in c.execute("PRAGMA table_info(commandes)")]
+        if migrer: self.migrer_registre()
+        with self._connexion() as c: c.executescript(SCHEMA)
+        if fichier_json and self._meta("migration_json") is None:
+            self.migrer_json(fichier_json)
+
+    # --- CONNEXION ---
+    @contextmanager
+    def _connexion(self):
+        try: c = self._pool.get_nowait()
+        except queue.Empty:
+            # Utilisée par un seul thread à la fois, mais pas toujours celui qui l'a ouverte
+            c = sqlite3.connect(self.chemin, timeout=10, isolation_level=None, check_same_thread=False)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield c
+        finally:
+            if c.in_transaction: c.execute("ROLLBACK")
+            if self._pool.qsize() < TAILLE_POOL: self._pool.put(c)
+            else: c.close()
+
+    def fermer(self):
+        """Ferme les connexions libres du pool (association évincée)."""
+        while True:
+            try: self._pool.get_nowait().close()
+            except queue.Empty: return
+
+    @contextmanager
+    def transaction(self):
+        with self._connexion() as c:
+            t, lignes = time.perf_counter(), c.total_changes
+            c.execute("BEGIN IMMEDIATE")
+            compteur = _Compteur(c)
+            try:
+                yield compteur
+                c.execute("UPDATE meta SET valeur = CAST(valeur AS INTEGER) + 1 WHERE cle = 'version'")
+                version = int(c.execute("SELECT valeur FROM meta WHERE cle = 'version'").fetchone()[0])
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+            # Counter n'est pas atomique : léger écart possible entre threads, sans conséquence pour des statistiques
+            self.stats.update(transactions=1, lignes=c.total_changes - lignes - 1, octets=compteur.octets, secondes=time.perf_counter() - t)
+        for f in self.ecoutes: f(version)
+
+    def _meta(self, cle):
+        with self._connexion() as c: return _meta(c, cle)
+
+    def annee(self):
+        """Année de la saison en cours (par défaut l'année civile)."""
+        a = self._meta("annee")
+        return int(a) if a is not None else datetime.now().year
+
+    def nouvelle_saison(self, etat, annee):
+        """Clôture : état remis à zéro et année suivante, dans une seule transaction."""
+        with self.transaction() as c:
+            self._remplacer(c, etat)
+            c.execute("INSERT OR REPLACE INTO meta VALUES ('annee', ?)", (str(int(annee)),))
+
+    def version(self):
+        """Numéro incrémenté à chaque écriture, quel que soit le processus."""
+        return int(self._meta("version") or 0)
+
+    # --- LECTURE ---
+    def charger(self):
+        """Reconstruit l'état complet, au même format que l'ancien rhum_etat.json."""
+        with self._connexion() as c: return lire_etat(c)
+
+    def registre(self):
+        """{nom: identifiant} de tout le registre des adhérents (anciens compris)."""
+        with self._connexion() as c: return dict(c.execute("SELECT nom, id FROM adherents"))
+
+    def gratuits(self):
+        """Noms des adhérents gratuits à vie (drapeau précalculé du registre)."""
+        with self._connexion() as c: return frozenset(n for n, in c.execute("SELECT nom FROM adherents WHERE gratuit"))
+
+    # --- ÉCRITURES (seul chemin d'édition : champ par champ, fusion entre processus) ---
+    def ecrire_entites(self, etat, entites, version_attendue=None):
+        """Écrit en une transaction la valeur courante dans `etat` des entités marquées modifiées.
+
+        `entites` : liste d'entités ou dict {entité: champs modifiés (None = tous)}.
+        Voir ecrire_valeurs.
+        """
+        if not isinstance(entites, dict): entites = dict.fromkeys(entites)
+        return self.ecrire_valeurs({e: (champs, valeur_entite(etat, e)) for e, champs in entites.items()}, version_attendue)
+
+    def ecrire_valeurs(self, valeurs, version_attendue=None):
+        """Écrit en une transaction des valeurs relevées par `valeur_entite` : {entité: (champs modifiés ou None, valeur)}.
+
+        Seuls les champs modifiés sont écrits : les autres champs modifiés par
+        un autre processus sont conservés (fusion). Sur un même champ, la
+        dernière écriture l'emporte. Si `version_attendue` est donnée, renvoie
+        True quand la base a été modifiée par ailleurs depuis cette version.
+        """
+        with self.transaction() as c:
+            actuelle = int(c.execute("SELECT valeur FROM meta WHERE cle = 'version'").fetchone()[0])
+            for (type_, *cle), (champs, valeur) in valeurs.items():
+                if type_ == "solde":
+                    c.execute("INSERT INTO meta VALUES ('solde_depart', ?) ON CONFLICT(cle) DO UPDATE SET valeur = excluded.valeur",
+                              (repr(_reel(valeur)),))
+                elif type_ == "adhesion":
+                    self._upsert_adhesion(c, cle[0], valeur)
+                elif type_ == "degustation":
+                    self._upsert_degustation(c, cle[0], valeur)
+                elif type_ in ("commande", "participant"):
+                    self._ecrire_champs(c, type_, (cle[0], self._id(c, cle[1])), valeur, champs)
+                elif valeur is not None:
+                    self._ecrire_champs(c, type_, cle, valeur, champs)
+                # Invité ou bouteille retiré : ligne supprimée
+                elif type_ == "invite":
+                    c.execute("DELETE FROM invites WHERE mois = ? AND rang = ?", cle)
+                else:
+                    c.execute("DELETE FROM rhumotheque WHERE id = ?", (cle[0],))
+        return version_attendue is not None and actuelle != version_attendue
+
+    def ajouter_adherents(self, noms):
+        with self.transaction() as c:
+            self._inscrire(c, noms)
+
+    def renommer_adherent(self, ancien, nouveau):
+        """Une seule ligne modifiée : les commandes, adhésions et participations suivent par identifiant."""
+        with self.transaction() as c:
+            if c.execute("SELECT 1 FROM adherents WHERE nom = ?", (nouveau,)).fetchone():
+                raise ValueError(f"{nouveau} existe déjà")
+            if not c.execute("UPDATE adherents SET nom = ?, gratuit = ? WHERE nom = ?",
+                             (nouveau, int(est_gratuit(nouveau)), ancien)).rowcount:
+                raise KeyError(ancien)
+
+    def remplacer_etat(self, etat):
+        """Réécrit tout l'état (reset d'année, migration)."""
+        with self.transaction() as c:
+            self._remplacer(c, etat)
+
+    # --- MIGRATION ---
+    def migrer_json(self, fichier_json):
+        """Import unique de l'ancien fichier rhum_etat.json (laissé intact sur disque)."""
+        if os.path.exists(fichier_json):
+            try:
+                with open(fichier_json, "r", encoding="utf-8") as f:
+                    etat = json.load(f)
+            except (OSError, ValueError) as e:
+                # Pas de migration d'un fichier tronqué : la base resterait vide sans le signaler
+                raise ValueError(f"{fichier_json} illisible, migration annulée : {e}") from e
+            self.remplacer_etat(etat)
+        with self.transaction() as c:
+            c.execute("INSERT OR REPLACE INTO meta VALUES ('migration_json', ?)", (fichier_json,))
+
+    def migrer_registre(self):
+        """Passage unique des tables indexées par nom au registre des adhérents (identifiants entiers)."""
+        with self._connexion() as c:
+            try:
+                c.executescript(MIGRATION_REGISTRE)
+            except sqlite3.OperationalError:
+                if c.in_transaction: c.execute("ROLLBACK")
+                # Migration déjà faite entre-temps par un autre processus
+                if "nom" in [col[1] for col in c.execute("PRAGMA table_info(commandes)")]: raise
+                return
+        with self.transaction() as c:
+            c.executemany("UPDATE adherents SET gratuit = 1 WHERE id = ?",
+                          [(i,) for i, n in c.execute("SELECT id, nom FROM adherents").fetchall() if est_gratuit(n)])
+
+    # --- REQUÊTES SQL ---
+    @classmethod
+    def _remplacer(cls, c, etat):
+        """Corps de remplacer_etat, dans la transaction `c`."""
+        for t in ("mois", "commandes", "adhesions", "degustations", "participants", "invites", "rhumotheque"):
+            c.execute(f"DELETE FROM {t}")
+        # Le registre est gardé : les identifiants restent stables d'une saison à l'autre
+        c.execute("UPDATE adherents SET actif = 0")
+        cls._inscrire(c, etat.get("adherents_noms", []))
+        for m, d in etat.get("mois_data", {}).items():
+            cls._upsert_mois(c, m, d)
+            for nom, v in d.get("adherents", {}).items():
+                cls._upsert_commande(c, m, nom, v.get("qte", 0), v.get("paye", False))
+        for n, p in etat.get("adhesions", {}).items(): cls._upsert_adhesion(c, n, p)
+        for m, dg in etat.get("degustations", {}).items():
+            cls._upsert_degustation(c, m, dg.get("prix_bouteilles", 0.0))
+            for nom, p in dg.get("participants", {}).items():
+                cls._upsert_participant(c, m, nom, p)
+            cls._remplacer_invites(c, m, dg.get("invites", []))
+        for id_rhum, rd in etat.get("rhumotheque", {}).items():
+            cls._upsert_rhum(c, id_rhum, rd)
+        c.execute("INSERT INTO meta VALUES ('solde_depart', ?) ON CONFLICT(cle) DO UPDATE SET valeur = excluded.valeur",
+                  (repr(_reel(etat.get("solde_depart", 0.0))),))
+
+    @staticmethod
+    def _ecrire_champs(c, type_, cle, valeurs, champs=None):
+        """Upsert limité aux `champs` (tous si None, ou si la ligne n'existait pas)."""
+        table, cles, colonnes = CHAMPS[type_]
+        if c.execute(f"INSERT OR IGNORE INTO {table} ({', '.join(cles)}) VALUES ({', '.join('?' * len(cles))})", cle).rowcount:
+            champs = None
+        noms = [ch for ch in colonnes if champs is None or ch in champs]
+        if noms:
+            c.execute(f"UPDATE {table} SET {', '.join(f'{ch} = ?' for ch in noms)} WHERE {' AND '.join(f'{k} = ?' for k in cles)}",
+                      [colonnes[ch](valeurs.get(ch)) for ch in noms] + list(cle))
+
+    @staticmethod
+    def _upsert_mois(c, mois, d):
+        c.execute("""INSERT INTO mois VALUES (?, ?, ?, ?) ON CONFLICT(mois) DO UPDATE SET
+                     nom_bouteille = excluded.nom_bouteille, prix_achat = excluded.prix_achat, prix_sample = excluded.prix_sample""",
+                  (mois, d.get("nom_bouteille", "") or "", _reel(d.get("prix_achat")), _reel(d.get("prix_sample"))))
+
+    @staticmethod
+    def _id(c, nom):
+        """Identifiant de `nom` dans le registre ; ajouté (hors liste des adhérents) s'il n'y est pas."""
+        r = c.execute("SELECT id FROM adherents WHERE nom = ?", (nom,)).fetchone()
+        if r: return r[0]
+        return c.execute("INSERT INTO adherents (nom, gratuit, actif) VALUES (?, ?, 0)", (nom, int(est_gratuit(nom)))).lastrowid
+
+    @staticmethod
+    def _inscrire(c, noms):
+        c.executemany("INSERT INTO adherents (nom, gratuit) VALUES (?, ?) ON CONFLICT(nom) DO UPDATE SET actif = 1",
+                      [(n, int(est_gratuit(n))) for n in noms])
+
+    @classmethod
+    def _upsert_commande(cls, c, mois, nom, qte, paye):
+        c.execute("""INSERT INTO commandes VALUES (?, ?, ?, ?) ON CONFLICT(mois, adherent) DO UPDATE SET
+                     qte = excluded.qte, paye = excluded.paye""", (mois, cls._id(c, nom), _entier(qte), _bool(paye)))
+
+    @classmethod
+    def _upsert_adhesion(cls, c, nom, paye):
+        c.execute("INSERT INTO adhesions VALUES (?, ?) ON CONFLICT(adherent) DO UPDATE SET paye = excluded.paye",
+                  (cls._id(c, nom), _bool(paye)))
+
+    @staticmethod
+    def _upsert_degustation(c, mois, prix_bouteilles):
+        c.execute("INSERT INTO degustations VALUES (?, ?) ON CONFLICT(mois) DO UPDATE SET prix_bouteilles = excluded.prix_bouteilles",
+                  (mois, _reel(prix_bouteilles)))
+
+    @classmethod
+    def _upsert_participant(cls, c, mois, nom, p):
+        c.execute("""INSERT INTO participants VALUES (?, ?, ?, ?, ?) ON CONFLICT(mois, adherent) DO UPDATE SET
+                     inscrit = excluded.inscrit, repas = excluded.repas, paye = excluded.paye""",
+                  (mois, cls._id(c, nom), _bool(p.get("inscrit")), _bool(p.get("repas")), _bool(p.get("paye"))))
+
+    @staticmethod
+    def _remplacer_invites(c, mois, invites):
+        c.execute("DELETE FROM invites WHERE mois = ?", (mois,))
+        c.executemany("INSERT INTO invites VALUES (?, ?, ?, ?, ?)",
+                      [(mois, inv.get("id", i), str(inv.get("nom") or ""), _bool(inv.get("repas")), _bool(inv.get("paye")))
+                       for i, inv in enumerate(invites)])
+
+    @staticmethod
+    def _upsert_rhum(c, id_rhum, rd):
+        c.execute("""INSERT INTO rhumotheque VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET
+                     nom = excluded.nom, mois_ref = excluded.mois_ref, en_stock = excluded.en_stock,
+                     valeur = excluded.valeur, notes = excluded.notes""",
+                  (id_rhum, rd.get("nom", "") or "", rd.get("mois_ref"), _bool(rd.get("en_stock", True)),
+                   _reel(rd.get("valeur")), rd.get("notes", "") or ""))
@@ -0,0 +1,173 @@
+"""Grand livre de trésorerie tenu à jour par deltas.
+
+Les agrégats par mois, par dégustation et pour les adhésions sont mis à jour
+à chaque modification ; les totaux du bilan sont donc lus en O(1).
+`verifier()` refait le calcul complet pour détecter une éventuelle dérive.
+"""
+import threading
+
+from .metier import CAPACITE_BOUTEILLE, COTISATION, PRIX_DEGUSTATION, PRIX_REPAS, RHUMOTHEQUE_PRELEVEMENT
+
+TOLERANCE = 0.005
+
+
+def _agregat_mois(d):
+    cmd = d["adherents"].values()
+    return {"qte": sum(v["qte"] for v in cmd), "payes": sum(v["qte"] for v in cmd if v["paye"]),
+            "prix_achat": d["prix_achat"], "prix_sample": d["prix_sample"]}
+
+
+def _marge_mois(a):
+    return a["payes"] * a["prix_sample"] - a["prix_achat"] if a["qte"] > 0 else 0
+
+
+def _participant(p):
+    # (encaissé, repas) pour un adhérent inscrit à une dégustation
+    if not p or not p.get("inscrit"): return 0, 0
+    return (PRIX_DEGUSTATION if p.get("paye") else 0), (1 if p.get("repas") else 0)
+
+
+def _invites(invites):
+    return (sum(PRIX_DEGUSTATION for i in invites if i.get("paye")),
+            sum(1 for i in invites if i.get("repas")))
+
+
+def _agregat_degustation(dg):
+    ca, repas = _invites(dg["invites"])
+    for p in dg["participants"].values():
+        c, r = _participant(p)
+        ca += c
+        repas += r
+    return {"ca": ca, "repas": repas, "prix_bouteilles": dg.get("prix_bouteilles", 0)}
+
+
+def _marge_degustation(a):
+    return a["ca"] - PRIX_REPAS * a["repas"] - a["prix_bouteilles"]
+
+
+def calculer(etat):
+    """Calcul complet (référence pour `verifier`)."""
+    mois = {m: _agregat_mois(d) for m, d in etat["mois_data"].items()}
+    degs = {m: _agregat_degustation(dg) for m, dg in etat["degustations"].items()}
+    return {
+        "mois": mois,
+        "degustations": degs,
+        "adhesions_payees": sum(1 for p in etat["adhesions"].values() if p),
+        "tot_samples_marge": sum(_marge_mois(a) for a in mois.values()),
+        "tot_samples_qty": sum(a["qte"] for a in mois.values() if a["qte"] > 0),
+        "tot_deg_marge": sum(_marge_degustation(a) for a in degs.values()),
+    }
+
+
+def valeur_stock(etat):
+    """Valeur latente des samples invendus (même calcul que Analytique.stock, sans NumPy)."""
+    rh, total = etat["rhumotheque"], 0.0
+    for m, d in etat["mois_data"].items():
+        vendus = sum(v["qte"] or 0 for v in d["adherents"].values())
+        preleve = RHUMOTHEQUE_PRELEVEMENT if m in rh and rh[m].get("en_stock") else 0
+        restant = max(CAPACITE_BOUTEILLE, vendus + preleve) - vendus - preleve
+        if d["nom_bouteille"] and restant > 0: total += restant * d["prix_sample"]
+    return total
+
+
+def bilan(etat):
+    """Bilan de l'année en un dictionnaire (rapports en lot, sans Streamlit ni NumPy)."""
+    c = calculer(etat)
+    adhesions = COTISATION * c["adhesions_payees"]
+    activite = c["tot_samples_marge"] + adhesions + c["tot_deg_marge"]
+    en_stock = [r for r in etat["rhumotheque"].values() if r.get("en_stock", True) and r.get("nom")]
+    return {
+        "solde_depart": etat["solde_depart"],
+        "marge_samples": c["tot_samples_marge"],
+        "adhesions": adhesions,
+        "marge_degustations": c["tot_deg_marge"],
+        "activite": activite,
+        "caisse_finale": etat["solde_depart"] + activite,
+        "adherents": len(etat["adherents_noms"]),
+        "samples": c["tot_samples_qty"],
+        "valeur_stock": valeur_stock(etat),
+        "bouteilles_rhumotheque": len(en_stock),
+        "valeur_rhumotheque": sum(r.get("valeur", 0.0) or 0.0 for r in en_stock),
+    }
+
+
+class GrandLivre:
+    def __init__(self, etat):
+        self._verrou = threading.Lock()
+        self._init(calculer(etat))
+
+    def _init(self, c):
+        self.mois = c["mois"]
+        self.degustations = c["degustations"]
+        self.adhesions_payees = c["adhesions_payees"]
+        self.tot_samples_marge = c["tot_samples_marge"]
+        self.tot_samples_qty = c["tot_samples_qty"]
+        self.tot_deg_marge = c["tot_deg_marge"]
+
+    # --- TOTAUX ---
+    @property
+    def tot_adh_encaisse(self):
+        return COTISATION * self.adhesions_payees
+
+    @property
+    def activite(self):
+        return self.tot_samples_marge + self.tot_adh_encaisse + self.tot_deg_marge
+
+    # --- DELTAS ---
+    def _maj_mois(self, mois, **delta):
+        a = self.mois.setdefault(mois, {"qte": 0, "payes": 0, "prix_achat": 0.0, "prix_sample": 0.0})
+        self.tot_samples_marge -= _marge_mois(a)
+        if a["qte"] > 0: self.tot_samples_qty -= a["qte"]
+        for k, v in delta.items():
+            if k in ("qte", "payes"): a[k] += v
+            else: a[k] = v
+        self.tot_samples_marge += _marge_mois(a)
+        if a["qte"] > 0: self.tot_samples_qty += a["qte"]
+
+    def _maj_degustation(self, mois, ca=0, repas=0, **prix):
+        a = self.degustations.setdefault(mois, {"ca": 0, "repas": 0, "prix_bouteilles": 0.0})
+        self.tot_deg_marge -= _marge_degustation(a)
+        a["ca"] += ca
+        a["repas"] += repas
+        a.update(prix)
+        self.tot_deg_marge += _marge_degustation(a)
+
+    def prix_mois(self, mois, prix_achat, prix_sample):
+        with self._verrou: self._maj_mois(mois, prix_achat=prix_achat, prix_sample=prix_sample)
+
+    def commande(self, mois, ancienne, nouvelle):
+        """ancienne / nouvelle : {"qte", "paye"} avant et après modification."""
+        def payes(v): return v["qte"] if v["paye"] else 0
+        with self._verrou:
+            self._maj_mois(mois, qte=nouvelle["qte"] - ancienne["qte"], payes=payes(nouvelle) - payes(ancienne))
+
+    def adhesion(self, ancien, nouveau):
+        with self._verrou: self.adhesions_payees += bool(nouveau) - bool(ancien)
+
+    def prix_degustation(self, mois, prix_bouteilles):
+        with self._verrou: self._maj_degustation(mois, prix_bouteilles=prix_bouteilles)
+
+    def participant(self, mois, ancien, nouveau):
+        (c0, r0), (c1, r1) = _participant(ancien), _participant(nouveau)
+        with self._verrou: self._maj_degustation(mois, ca=c1 - c0, repas=r1 - r0)
+
+    def invites(self, mois, anciens, nouveaux):
+        (c0, r0), (c1, r1) = _invites(anciens), _invites(nouveaux)
+        with self._verrou: self._maj_degustation(mois, ca=c1 - c0, repas=r1 - r0)
+
+    # --- CONTRÔLE ---
+    def verifier(self, etat, corriger=True):
+        """Recalcule tout et renvoie les écarts [(clé, tenu, recalculé)] ; resynchronise si demandé."""
+        ref = calculer(etat)
+        ecarts = []
+        for cle in ("adhesions_payees", "tot_samples_marge", "tot_samples_qty", "tot_deg_marge"):
+            if abs(getattr(self, cle) - ref[cle]) > TOLERANCE: ecarts.append((cle, getattr(self, cle), ref[cle]))
+        for groupe in ("mois", "degustations"):
+            tenu = getattr(self, groupe)
+            for m in set(tenu) | set(ref[groupe]):
+                a, b = tenu.get(m, {}), ref[groupe].get(m, {})
+                for k in set(a) | set(b):
+                    if abs(a.get(k, 0) - b.get(k, 0)) > TOLERANCE: ecarts.append((f"{groupe}.{m}.{k}", a.get(k, 0), b.get(k, 0)))
+        if ecarts and corriger:
+            with self._verrou: self._init(ref)
+        return ecarts
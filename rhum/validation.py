@@ -0,0 +1,66 @@
+"""Contrôle de la structure d'un état (rhum_etat.json ou base chargée).
+
+`valider()` renvoie deux listes de messages : les erreurs, qui empêchent
+de calculer un bilan ou un export, et les avertissements (incohérences
+sans danger, comme une commande d'un adhérent retiré de la liste).
+"""
+from numbers import Real
+
+from .metier import MOIS_DEGUSTATIONS, MOIS_SAMPLES
+
+CLES = {"adherents_noms": list, "mois_data": dict, "adhesions": dict, "degustations": dict,
+        "solde_depart": Real, "rhumotheque": dict}
+
+
+def _nombre(v):
+    return isinstance(v, Real) and not isinstance(v, bool) and v == v
+
+
+def valider(etat):
+    """(erreurs, avertissements) de `etat`."""
+    erreurs, avert = [], []
+    if not isinstance(etat, dict): return ["l'état n'est pas un objet JSON"], []
+    for cle, type_ in CLES.items():
+        if cle not in etat: erreurs.append(f"clé manquante : {cle}")
+        elif not isinstance(etat[cle], type_) or isinstance(etat[cle], bool): erreurs.append(f"{cle} : type {type(etat[cle]).__name__} inattendu")
+    if erreurs: return erreurs, avert
+
+    noms = etat["adherents_noms"]
+    if not all(isinstance(n, str) and n.strip() for n in noms): erreurs.append("adherents_noms : nom vide ou non textuel")
+    connus = set(noms)
+    if len(connus) != len(noms): avert.append(f"adherents_noms : {len(noms) - len(connus)} doublon(s)")
+
+    for m in MOIS_SAMPLES:
+        if m not in etat["mois_data"]: avert.append(f"mois_data : mois {m} absent")
+    for m, d in etat["mois_data"].items():
+        if not isinstance(d, dict) or not isinstance(d.get("adherents"), dict):
+            erreurs.append(f"mois_data[{m}] : structure invalide")
+            continue
+        if not isinstance(d.get("nom_bouteille"), str): erreurs.append(f"mois_data[{m}].nom_bouteille : texte attendu")
+        for k in ("prix_achat", "prix_sample"):
+            if not _nombre(d.get(k)) or d[k] < 0: erreurs.append(f"mois_data[{m}].{k} : nombre positif attendu")
+        for n, v in d["adherents"].items():
+            if not isinstance(v, dict) or not _nombre(v.get("qte")) or v["qte"] < 0 or v["qte"] != int(v["qte"]) \
+                    or not isinstance(v.get("paye"), bool):
+                erreurs.append(f"mois_data[{m}].adherents[{n}] : qte entière positive et paye booléen attendus")
+            elif n not in connus: avert.append(f"mois_data[{m}] : commande de {n}, absent de la liste des adhérents")
+
+    for n, p in etat["adhesions"].items():
+        if not isinstance(p, bool): erreurs.append(f"adhesions[{n}] : booléen attendu")
+
+    for m in MOIS_DEGUSTATIONS:
+        if m not in etat["degustations"]: avert.append(f"degustations : {m} absente")
+    for m, dg in etat["degustations"].items():
+        if not isinstance(dg, dict) or not isinstance(dg.get("participants"), dict) or not isinstance(dg.get("invites"), list):
+            erreurs.append(f"degustations[{m}] : structure invalide")
+            continue
+        if "prix_bouteilles" in dg and not _nombre(dg["prix_bouteilles"]): erreurs.append(f"degustations[{m}].prix_bouteilles : nombre attendu")
+        for n, p in dg["participants"].items():
+            if not isinstance(p, dict): erreurs.append(f"degustations[{m}].participants[{n}] : objet attendu")
+            elif n not in connus: avert.append(f"degustations[{m}] : {n} absent de la liste des adhérents")
+        if not all(isinstance(i, dict) for i in dg["invites"]): erreurs.append(f"degustations[{m}].invites : objets attendus")
+
+    for i, r in etat["rhumotheque"].items():
+        if not isinstance(r, dict): erreurs.append(f"rhumotheque[{i}] : objet attendu")
+        elif "valeur" in r and not _nombre(r["valeur"]): erreurs.append(f"rhumotheque[{i}].valeur : nombre attendu")
+    return erreurs, avert
@@ -0,0 +1,112 @@
+"""Migration d'une base à l'ancien schéma (tables indexées par nom) vers le registre des adhérents."""
+import sqlite3
+
+from rhum.metier import etat_vide
+from rhum.stockage import DepotRhum
+
+# Schéma d'avant le registre, tel que créé par les versions précédentes
+SCHEMA_V1 = """
+CREATE TABLE meta (cle TEXT PRIMARY KEY, valeur TEXT);
+INSERT INTO meta VALUES ('version', '7');
+INSERT INTO meta VALUES ('solde_depart', '120.5');
+CREATE TABLE adherents (nom TEXT PRIMARY KEY);
+CREATE TABLE mois (
+    mois TEXT PRIMARY KEY, nom_bouteille TEXT NOT NULL DEFAULT '',
+    prix_achat REAL NOT NULL DEFAULT 0, prix_sample REAL NOT NULL DEFAULT 0);
+CREATE TABLE commandes (
+    mois TEXT NOT NULL, nom TEXT NOT NULL, qte INTEGER NOT NULL DEFAULT 0, paye INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mois, nom));
+CREATE INDEX idx_commandes_nom ON commandes (nom);
+CREATE TABLE adhesions (nom TEXT PRIMARY KEY, paye INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE degustations (mois TEXT PRIMARY KEY, prix_bouteilles REAL NOT NULL DEFAULT 0);
+CREATE TABLE participants (
+    mois TEXT NOT NULL, nom TEXT NOT NULL,
+    inscrit INTEGER NOT NULL DEFAULT 0, repas INTEGER NOT NULL DEFAULT 0, paye INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mois, nom));
+CREATE INDEX idx_participants_nom ON participants (nom);
+CREATE TABLE invites (
+    mois TEXT NOT NULL, rang INTEGER NOT NULL, nom TEXT NOT NULL DEFAULT '',
+    repas INTEGER NOT NULL DEFAULT 0, paye INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mois, rang));
+CREATE TABLE rhumotheque (
+    id TEXT PRIMARY KEY, nom TEXT NOT NULL DEFAULT '', mois_ref TEXT,
+    en_stock INTEGER NOT NULL DEFAULT 1, valeur REAL NOT NULL DEFAULT 0, notes TEXT NOT NULL DEFAULT '');
+
+INSERT INTO adherents VALUES ('MARTIN Paul'), ('BORDES Anne'), ('DUPONT Jean');
+INSERT INTO mois VALUES ('Février', 'Diplomatico', 60.0, 4.5), ('Mars', '', 0, 0);
+-- ANCIEN Membre n'est plus dans la liste mais garde une commande
+INSERT INTO commandes VALUES ('Février', 'DUPONT Jean', 2, 1), ('Février', 'ANCIEN Membre', 1, 0), ('Mars', 'MARTIN Paul', 3, 0);
+INSERT INTO adhesions VALUES ('DUPONT Jean', 1), ('MARTIN Paul', 0);
+INSERT INTO degustations VALUES ('Mars', 80.0), ('Juin', 0);
+INSERT INTO participants VALUES ('Mars', 'MARTIN Paul', 1, 1, 0), ('Mars', 'BORDES Anne', 1, 0, 1);
+INSERT INTO invites VALUES ('Mars', 0, 'Invité Un', 1, 1), ('Mars', 1, 'Invité Deux', 0, 0);
+INSERT INTO rhumotheque VALUES ('Février', 'Diplomatico', 'Février', 1, 45.0, 'ouverte'), ('r1', 'Clément', NULL, 0, 30.0, '');
+"""
+
+
+def attendu():
+    """État que doit relire DepotRhum : celui de la base v1, sur un état vide (tous les mois présents)."""
+    etat = etat_vide()
+    etat["adherents_noms"] = ["BORDES Anne", "DUPONT Jean", "MARTIN Paul"]  # liste triée par le registre
+    etat["solde_depart"] = 120.5
+    etat["mois_data"]["Février"] = {"nom_bouteille": "Diplomatico", "prix_achat": 60.0, "prix_sample": 4.5,
+                                    "adherents": {"DUPONT Jean": {"qte": 2, "paye": True}, "ANCIEN Membre": {"qte": 1, "paye": False}}}
+    etat["mois_data"]["Mars"] = {"nom_bouteille": "", "prix_achat": 0.0, "prix_sample": 0.0,
+                                 "adherents": {"MARTIN Paul": {"qte": 3, "paye": False}}}
+    etat["adhesions"] = {"DUPONT Jean": True, "MARTIN Paul": False}
+    etat["degustations"]["Mars"] = {"prix_bouteilles": 80.0,
+                                    "participants": {"MARTIN Paul": {"inscrit": True, "repas": True, "paye": False},
+                                                     "BORDES Anne": {"inscrit": True, "repas": False, "paye": True}},
+                                    "invites": [{"id": 0, "nom": "Invité Un", "repas": True, "paye": True},
+                                                {"id": 1, "nom": "Invité Deux", "repas": False, "paye": False}]}
+    etat["rhumotheque"] = {
+        "Février": {"nom": "Diplomatico", "mois_ref": "Février", "en_stock": True, "valeur": 45.0, "notes": "ouverte"},
+        "r1": {"nom": "Clément", "en_stock": False, "valeur": 30.0, "notes": ""},
+    }
+    return etat
+
+
+def base_v1(chemin):
+    c = sqlite3.connect(chemin)
+    c.executescript(SCHEMA_V1)
+    c.close()
+
+
+def test_migration_registre(tmp_path):
+    chemin = str(tmp_path / "rhum_etat.db")
+    base_v1(chemin)
+    depot = DepotRhum(chemin)
+    try:
+        assert depot.charger() == attendu()
+        version = depot.version()
+        assert version > 7  # les autres processus voient que la base a changé
+        assert depot.gratuits() == {"BORDES Anne"}
+        # Ancien adhérent gardé dans le registre, hors liste
+        assert set(depot.registre()) == {"BORDES Anne", "DUPONT Jean", "MARTIN Paul", "ANCIEN Membre"}
+        c = sqlite3.connect(chemin)
+        assert not c.execute("SELECT name FROM sqlite_master WHERE name LIKE 'v1_%'").fetchall()
+        c.close()
+    finally:
+        depot.fermer()
+
+    # Base déjà migrée : rouverte telle quelle
+    depot = DepotRhum(chemin)
+    try:
+        assert depot.charger() == attendu()
+        assert depot.version() == version
+    finally:
+        depot.fermer()
+
+
+def test_migration_puis_ecriture_par_identifiant(tmp_path):
+    chemin = str(tmp_path / "rhum_etat.db")
+    base_v1(chemin)
+    depot = DepotRhum(chemin)
+    try:
+        depot.renommer_adherent("DUPONT Jean", "DUPONT Jeanne")
+        etat = depot.charger()
+        assert etat["mois_data"]["Février"]["adherents"]["DUPONT Jeanne"] == {"qte": 2, "paye": True}
+        assert etat["adhesions"]["DUPONT Jeanne"] is True
+        assert "DUPONT Jean" not in etat["adhesions"]
+    finally:
+        depot.fermer()